@@ -1,52 +1,50 @@
 '''BEAM module analysis
 '''
+from io import StringIO
+from operator import attrgetter
 
-from .instset import BeamInstFuncInfo, BeamInstLabel, BeamInst, BeamInstCall, \
-    BeamInstCallOnly, BeamInstCallLast, BeamInstCallExt, BeamInstCallExtLast, \
-    BeamInstCallExtOnly, BeamInstSelectVal, BeamInstSelectTupleArity
+from .types import BeamAtom, BeamInteger, BeamLiteral, BeamLabel, BeamXReg, \
+    BeamYReg
+from .instset import KIND_LABEL, KIND_FUNC_INFO, KIND_CALL, KIND_CALL_EXT, \
+    KIND_SELECT_VAL, KIND_SELECT_TUPLE_ARITY
 from .sections import BeamCodeSection
 from .module import BeamFile
 
-####################################################
-# Meta-instructions
-####################################################
-
-class MetaInstSwitchCase(BeamInst):
-    '''Switch case meta instruction
-
-    This meta instruction is meant to replace `select_val` and provide a more
-    readable disassembly code
-    '''
-    def __init__(self, tested_value, branches):
-        super().__init__('switchCase')
-        self.branches = branches
-        self.tested_value = tested_value
-
-    def to_string(self, module):
-        '''Render a select_val instruction into a readable switch...case.
-        '''
-        output = 'switch(%s) {\n' % module.get_value(self.tested_value)
-        for i in self.branches:
-            output += 'case %s:\n' % module.get_value(i)
-            block_id = self.branches[i]
-            # append code block
-            block = module.get_block()
-
+# Kinds of instructions `Beamalyzer.annotate()` cares about, as a bitmask
+ANNOTATED_KINDS = (1 << KIND_CALL) | (1 << KIND_CALL_EXT) | \
+    (1 << KIND_SELECT_VAL) | (1 << KIND_SELECT_TUPLE_ARITY)
 
 class CodeBlock(object):
     '''This class represents a block of code, i.e. a set of instructions that
     starts with a label and ends when a new label is declared.
     '''
 
+    __slots__ = (
+        '__label', '__insts', '__outgoing', '__ingoing', '__external',
+        '__outgoing_set', '__out_targets', '__ingoing_set', '__external_set',
+        '__next', '__annotations', '__kinds'
+    )
+
     def __init__(self, label):
         self.__label = label
         self.__insts = []
         self.__outgoing = []
         self.__ingoing = []
         self.__external = []
+
+        # Set-backed indexes for O(1) membership tests, lists above keep
+        # insertion order for rendering.
+        self.__outgoing_set = set()
+        self.__out_targets = set()
+        self.__ingoing_set = set()
+        self.__external_set = set()
+
         self.__next = None
         self.__annotations = []
 
+        # Bitmask of the kinds of instructions found in this block
+        self.__kinds = 0
+
     @property
     def label(self):
         return self.__label
@@ -55,6 +53,10 @@ class CodeBlock(object):
     def next(self):
         return self.__next
 
+    @property
+    def kinds(self):
+        return self.__kinds
+
     def add_annotation(self, annotation):
         self.__annotations.append(annotation)
 
@@ -62,44 +64,47 @@ class CodeBlock(object):
         '''Add an instruction to this code block.
         '''
         self.__insts.append(inst)
+        self.__kinds |= 1 << inst.kind
 
     def has_in_link(self, block):
         '''Test if this code block can be reached by another block.
         '''
-        return block in self.__ingoing
+        return block in self.__ingoing_set
 
     def add_in_link(self, block):
         '''Add a new ingoing link.
 
         Return True if link is new, False otherwise.
         '''
-        if block in self.__ingoing:
+        if block in self.__ingoing_set:
             return False
+        self.__ingoing_set.add(block)
         self.__ingoing.append(block)
         return True
 
     def has_out_link(self, block):
         '''Test if this code block can reach another block.
         '''
-        for inst, target in self.__outgoing:
-            if target == block:
-                return True
-        return False
+        return block in self.__out_targets
 
     def add_out_link(self, inst, block):
         '''Add a new outgoing link.
 
         Return True if link is new, False otherwise.
         '''
-        if (inst, block) in self.__outgoing:
+        link = (inst, block)
+        if link in self.__outgoing_set:
             return False
-        self.__outgoing.append((inst, block))
+        self.__outgoing_set.add(link)
+        self.__out_targets.add(block)
+        self.__outgoing.append(link)
         return True
 
     def add_external_ref(self, caller: str):
         '''Add an external caller
         '''
-        if caller not in self.__external:
+        if caller not in self.__external_set:
+            self.__external_set.add(caller)
             self.__external.append(caller)
 
     def set_next(self, next):
@@ -125,25 +130,26 @@ class CodeBlock(object):
     def to_string(self, module):
         '''Convert code block to string
         '''
-        output = ''
- 
-        # Add annotations first
+        output = []
+        append = output.append
+
+        # Add annotations first
         for annotation in self.__annotations:
-            output += '%s\n' % annotation
-        
-        # Add external callers here
+            append('%s\n' % annotation)
+
+        # Add external callers here
         for ext_ref in self.__external:
-            output += '; => Externally called from <%s>\n' % ext_ref
+            append('; => Externally called from <%s>\n' % ext_ref)
 
         # Add internal callers here
         for in_link in self.__ingoing:
-            output += '; => Called from label%d\n' % in_link
-        output += 'label%d:\n' % self.label
+            append('; => Called from label%d\n' % in_link)
+        append('label%d:\n' % self.label)
         for inst in self.__insts:
-            output += '%s\n' % inst.to_string(module)
+            append('%s\n' % inst.to_string(module))
 
-        output += '\n'
-        return output
+        append('\n')
+        return ''.join(output)
 
 
     def __len__(self):
@@ -160,14 +166,25 @@ class FunctionInfo(object):
     - the function module, name and arity
     - a list of labels belonging to the function
     '''
+
+    __slots__ = (
+        '__module', '__name', '__arity', '__blocks', '__blocks_set',
+        '__str_module', '__str_cache'
+    )
+
     def __init__(self, func_info, blocks):
         # Save function information
         self.__module = func_info.operands[0].index
         self.__name = func_info.operands[1].index
         self.__arity = func_info.operands[2].index
 
-        # Initialize a list of labels
+        # Initialize a list of labels, along with a set for fast lookups
         self.__blocks = blocks
+        self.__blocks_set = set(blocks)
+
+        # Function signature, rendered on first use with a given module
+        self.__str_module = None
+        self.__str_cache = None
 
     @property
     def blocks(self):
@@ -176,12 +193,13 @@ class FunctionInfo(object):
     def has_block(self, block):
         '''Check if block is already associated to this function
         '''
-        return block in self.__blocks
+        return block in self.__blocks_set
 
     def add_block(self, block):
         '''Assign a block to this function
         '''
         self.__blocks.append(block)
+        self.__blocks_set.add(block)
 
 
     def __repr__(self):
@@ -194,11 +212,14 @@ class FunctionInfo(object):
         )
 
     def to_string(self, module):
-        return '%s:%s/%d' % (
-            module.get_atom(self.__module),
-            module.get_atom(self.__name),
-            self.__arity
-        )
+        if self.__str_module is not module:
+            self.__str_cache = '%s:%s/%d' % (
+                module.get_atom(self.__module),
+                module.get_atom(self.__name),
+                self.__arity
+            )
+            self.__str_module = module
+        return self.__str_cache
 
 class CodeItemizer(object):
     '''Code itemizer
@@ -214,15 +235,15 @@ class CodeItemizer(object):
     def __init__(self, code_section: BeamCodeSection):
         self.__code = code_section
         self.__blocks = {}
+        self.__sorted_blocks = []
 
-        # Split code into identified blocks
+        # Split code into identified blocks
         self.parse_code_blocks()
 
     def enumerate(self):
-        block_ids = list(self.__blocks.keys())
-        block_ids.sort()
-        for block_id in block_ids:
-            yield self.__blocks[block_id]
+        '''Enumerate code blocks, sorted by label number.
+        '''
+        yield from self.__sorted_blocks
 
 
     def get_block(self, block_id):
@@ -238,7 +259,7 @@ class CodeItemizer(object):
         current_block = None
         for inst in self.__code.insts:
             # Do we have a label ? Then we have a code block !
-            if isinstance(inst, BeamInstLabel):
+            if inst.kind == KIND_LABEL:
                 if current_block is not None:
                     self.__blocks[current_block.label] = current_block
                 current_block = CodeBlock(inst.operands[0].index)
@@ -246,10 +267,15 @@ class CodeItemizer(object):
             elif current_block is not None:
                 current_block.add_inst(inst)
 
-        # Add our last current block, if any
+        # Add our last current block, if any
         if current_block is not None:
             self.__blocks[current_block.label] = current_block
 
+        # Sort our blocks once and for all
+        self.__sorted_blocks = [
+            self.__blocks[block_id] for block_id in sorted(self.__blocks)
+        ]
+
 
 
 class FunctionFinder(object):
@@ -269,24 +295,27 @@ class FunctionFinder(object):
         '''
         # Loop on code instructions and keep track of current label.
         # We are looking for `BeamInstFuncInfo` instructions.
+        # All labels are kept in a single list, `first_label` being the index
+        # of the first label of the current function.
         functions = []
         current_function = None
-        current_labels = []
-        current_block = None
+        labels = []
+        first_label = 0
         for block in self.__itemizer.enumerate():
-            # Save label index as current label
-            current_labels.append(block.label)
+            # Save label index as current label
+            labels.append(block.label)
             for inst in block:
-                if isinstance(inst, BeamInstFuncInfo):
-                    # If we were parsing a previous function, add it to our
-                    # list of discovered functions
+                if inst.kind == KIND_FUNC_INFO:
+                    # If we were parsing a previous function, add it to our
+                    # list of discovered functions
                     if current_function is not None:
-                        # Save all the labels
+                        # Save all the labels but the current one
+                        last_label = len(labels) - 1
                         functions.append(FunctionInfo(
                             current_function,
-                            current_labels[:-1]
+                            labels[first_label:last_label]
                         ))
-                        current_labels = current_labels[-1:]
+                        first_label = last_label
 
                     # Set current function
                     current_function = inst
@@ -296,46 +325,84 @@ class FunctionFinder(object):
             # Save all the labels
             functions.append(FunctionInfo(
                 current_function,
-                current_labels
+                labels[first_label:]
             ))
         return functions
 
 
-    def graph_block(self, function, blocks, processed_blocks=None):
+    def graph_block(self, function, blocks):
         '''Create a graph for a given code block.
 
         It will follow the execution path and create links between blocks.
         '''
-        # Follow execution flow, register in/out links
+        # Follow execution flow, register in/out links
         prev_block = None
         for block in blocks:
             try:
                 # Takes care of default block chaining
                 current_block = self.__itemizer.get_block(block)
-                if prev_block is not None:
-                    prev_block.set_next(current_block.label)
+            except IndexError:
+                continue
+            if prev_block is not None:
+                prev_block.set_next(current_block.label)
 
-                # Look into each instruction of this block
-                for inst in current_block:
-                    # has the instruction some jump targets ?
-                    targets = inst.jump_targets
-                    if len(targets) > 0:
-                        # this block redirects to another block
-                        for target in targets:
-                            # Is it a block not defined in the function ?
-                            if not function.has_block(target):
-                                print('warn: function jumps to an external block')
-
-                            # Set xrefs
-                            if current_block.add_out_link(inst, target):
-                                self.graph_block(function, [target])
-                            target_block = self.__itemizer.get_block(target)
-                            target_block.add_in_link(current_block.label)
-
-                # Block done, go on with the next one
+            # Block done, go on with the next one
+            if self.walk_block(function, current_block):
                 prev_block = current_block
+
+    def walk_block(self, function, block):
+        '''Register the links of a code block, following depth-first every
+        new outgoing link before registering the matching ingoing link.
+
+        An explicit stack is used instead of recursion, so long chains of
+        blocks do not hit the interpreter recursion limit. Return False if
+        the walk of `block` stopped on an unknown target.
+        '''
+        get_block = self.__itemizer.get_block
+
+        # Each frame holds a block, its remaining jump targets and the target
+        # being walked (its ingoing link is registered once walked)
+        stack = [[block, self.iter_jump_targets(block), None]]
+        while len(stack) > 0:
+            frame = stack[-1]
+            current_block, targets, walked = frame
+            try:
+                if walked is not None:
+                    frame[2] = None
+                    get_block(walked).add_in_link(current_block.label)
+
+                # Look into each instruction of this block
+                for inst, target in targets:
+                    # Is it a block not defined in the function ?
+                    if not function.has_block(target):
+                        print('warn: function jumps to an external block')
+
+                    # Set xrefs, walk newly linked blocks first
+                    if current_block.add_out_link(inst, target):
+                        target_block = get_block(target)
+                        frame[2] = target
+                        stack.append([
+                            target_block, self.iter_jump_targets(target_block),
+                            None
+                        ])
+                        break
+                    get_block(target).add_in_link(current_block.label)
+                else:
+                    stack.pop()
             except IndexError:
-                pass
+                # Unknown target, this block is done
+                stack.pop()
+                if len(stack) == 0:
+                    return False
+        return True
+
+    @staticmethod
+    def iter_jump_targets(block):
+        '''Iterate over the (instruction, target) pairs of a code block.
+        '''
+        for inst in block:
+            for target in inst.jump_targets:
+                yield inst, target
 
 
     def graph_function(self, function: FunctionInfo):
@@ -355,6 +422,18 @@ class Beamalyzer(object):
     - a smart disassembler able to analyze the code and produce more readable assembly code
     '''
 
+    # Operand types formatted only from their type and a single attribute,
+    # along with a getter for this attribute (used as cache key by
+    # `get_value()`). The NIL atom is keyed on its raw index 0.
+    VALUE_KEYS = {
+        BeamAtom: lambda value: 0 if value.is_nil() else value.index,
+        BeamInteger: attrgetter('value'),
+        BeamLiteral: attrgetter('index'),
+        BeamLabel: attrgetter('index'),
+        BeamXReg: attrgetter('index'),
+        BeamYReg: attrgetter('index'),
+    }
+
     def __init__(self, beam_module: BeamFile):
         self.__module = beam_module
         self.__functions = None
@@ -363,11 +442,26 @@ class Beamalyzer(object):
         self.__itemizer = CodeItemizer(self.__module.code)
 
         # Create our function finder, find functions and graph code blocks.
+        # Graphing is done serially on purpose: every function links blocks
+        # shared through our itemizer (and possibly other functions' blocks),
+        # and handing them to worker processes would require pickling the
+        # whole code model and merging links back, which costs more than the
+        # graphing itself.
         self.__funcfinder = FunctionFinder(self.__itemizer)
         self.__functions = self.__funcfinder.find_functions()
         for func in self.__functions:
             self.__funcfinder.graph_function(func)
 
+        # Formatted operand values, see `get_value()`
+        self.__values = {}
+
+        # Map function signatures to their functions, first one wins
+        self.__funcs_by_sig = {}
+        for func in self.__functions:
+            func_sig = '<%s>' % func.to_string(self.__module)
+            if func_sig not in self.__funcs_by_sig:
+                self.__funcs_by_sig[func_sig] = func
+
     @property
     def module(self):
         return self.__module
@@ -376,121 +470,164 @@ class Beamalyzer(object):
     def functions(self):
         return self.__functions
 
+    def get_value(self, value):
+        '''Format an operand value through our module.
+
+        Registers, atoms, literals and integers are formatted once for each
+        (type, index or value) pair, other values every time.
+        '''
+        get_key = Beamalyzer.VALUE_KEYS.get(value.__class__)
+        if get_key is None:
+            return self.__module.get_value(value)
+        key = (value.__class__, get_key(value))
+        if key not in self.__values:
+            self.__values[key] = self.__module.get_value(value)
+        return self.__values[key]
+
     def add_function_caller(self, function_sig, caller):
         '''Annotate our function to specify a call from an external module
         '''
-        for func in self.__functions:
-            current_func_sig = '<%s>' % func.to_string(self.__module)
-            if current_func_sig == function_sig:
+        if function_sig in self.__funcs_by_sig:
+            func = self.__funcs_by_sig[function_sig]
+
+            # A function without any code block has nothing to annotate
+            if len(func.blocks) > 1:
                 block = self.__itemizer.get_block(func.blocks[1])
                 if block is not None:
                     block.add_external_ref(caller)
-                return True
+            return True
         return False
 
+    def write_to(self, out):
+        '''Write our internal code model as readable assembly code to `out`
+        (any object with a `write()` method), block by block.
+        '''
+        write = out.write
+        write('; Module: %s\n\n' % self.__module.name)
+        for block in self.__itemizer.enumerate():
+            write(block.to_string(self.__module))
+
     def __str__(self):
         '''Convert our internal code model into readable assembly code.
         '''
-        output = '; Module: %s\n\n' % self.__module.name
-        for block in self.__itemizer.enumerate():
-            output += block.to_string(self.__module)
-        return output
+        output = StringIO()
+        self.write_to(output)
+        return output.getvalue()
 
     def annotate(self, others=[]):
         '''Annotate code (internal xrefs mostly)
         '''
         # First, we create an associative array to map functions and their
-        # first real block of code (second label).
-        func_labels = {}
+        # first real block of code (second label), along with their names.
+        func_names = {}
         for function in self.__functions:
-            func_labels[function.blocks[1]] = function
+            if len(function.blocks) > 1:
+                func_names[function.blocks[1]] = function.to_string(
+                    self.__module
+                )
 
-        # Then we create an associtive array to map functions from other modules
-        # And their corresponding objects
+        # Then we create an associtive array to map functions from other modules
+        # And their corresponding objects
         mods_funcs = {}
         for mod in others:
             for func in mod.functions:
                 mods_funcs['<%s>' % func.to_string(mod.module)] = mod
 
+        # Imports are resolved once, whatever the number of call sites
+        import_cache = {}
+
         # Then we walk through each code block and add xrefs
+        current_func = None
         for block in self.__itemizer.enumerate():
-            # if block label matches a function, then add function info
-            if block.label in func_labels:
-                function = func_labels[block.label]
-                block.add_annotation('; Function <%s>' % function.to_string(self.__module))
+            # if block label matches a function, then add function info
+            if block.label in func_names:
+                current_func = func_names[block.label]
+                block.add_annotation('; Function <%s>' % current_func)
+
+            # Skip blocks that have no call or switch...case
+            if not (block.kinds & ANNOTATED_KINDS):
+                continue
 
             # Annotate calls & switch...case
             for inst in block:
-                if isinstance(inst, BeamInstCall) or isinstance(inst, BeamInstCallOnly) or isinstance(inst, BeamInstCallLast):
-                    # Resolve first operand
-                    if inst.operands[1].index in func_labels:
+                inst_kind = inst.kind
+                if inst_kind == KIND_CALL:
+                    # Resolve first operand (calls have operands, they are
+                    # never shared and can always be annotated)
+                    if inst.operands[1].index in func_names:
                         inst.add_annotation('\t; Calls %s\n' % (
-                            func_labels[inst.operands[1].index].to_string(self.__module)
+                            func_names[inst.operands[1].index]
                         ))
-                elif isinstance(inst, BeamInstCallExt) or isinstance(inst, BeamInstCallExtLast) or isinstance(inst, BeamInstCallExtOnly):
-                    try:
-                        # Resolve external function
-                        ext_func = self.__module.get_import_str(inst.operands[1].index)
-                        if ext_func in mods_funcs:
-                            mod = mods_funcs[ext_func]
-                            mod.add_function_caller(ext_func, function.to_string(self.__module))
-                    except Exception:
-                        pass
-                elif isinstance(inst, BeamInstSelectVal) or isinstance(inst, BeamInstSelectTupleArity):
-                    # Get the list of cases=>labels
-                    cases = []
-                    for i in range(int(len(inst.operands[2])/2)):
-                        cases.append((inst.operands[2][i*2], inst.operands[2][i*2+1]))
-
-                    # Annotate each label with the corresponding case
+                elif inst_kind == KIND_CALL_EXT:
+                    # Resolve external function
+                    import_index = inst.operands[1].index
+                    if import_index not in import_cache:
+                        try:
+                            import_cache[import_index] = \
+                                self.__module.get_import_str(import_index)
+                        except (IndexError, AttributeError):
+                            import_cache[import_index] = None
+                    ext_func = import_cache[import_index]
+                    if ext_func in mods_funcs and current_func is not None:
+                        mods_funcs[ext_func].add_function_caller(
+                            ext_func,
+                            current_func
+                        )
+                elif inst_kind == KIND_SELECT_VAL or \
+                        inst_kind == KIND_SELECT_TUPLE_ARITY:
+                    # Get the list of cases=>labels, pairing list items
+                    # two by two
+                    items = iter(inst.operands[2])
+                    cases = zip(items, items)
+
+                    # Annotate each label with the corresponding case
                     for value, label in cases:
-                        case_block = self.__itemizer.get_block(label.index)
-                        if case_block is not None:
-                            try:
-                                if isinstance(inst, BeamInstSelectTupleArity):
-                                    case_block.add_annotation('; Case {} (label{:d})'. format(
-                                        value.index,
-                                        block.label
-                                    ))
-                                else:
-                                    case_block.add_annotation('; Case {} (label{:d})'. format(
-                                        self.__module.get_value(value),
-                                        block.label
-                                    ))
-                            except Exception:
-                                pass
+                        try:
+                            case_block = self.__itemizer.get_block(label.index)
+                        except IndexError:
+                            continue
+                        if inst_kind == KIND_SELECT_TUPLE_ARITY:
+                            case_value = value.index
+                        else:
+                            case_value = self.get_value(value)
+                        case_block.add_annotation('; Case %s (label%d)' % (
+                            case_value,
+                            block.label
+                        ))
 
 
     def find_merging_block(self, block_a, block_b):
         '''Follow two paths starting from block A and B and look for a merging
         point.
         '''
+        get_block = self.__itemizer.get_block
         a_next = []
-        b_next = []
+        b_next = set()
 
         # Follow block A path (only next blocks)
         while block_a is not None:
             a_next.append(block_a)
-            block_a = self.__itemizer.get_block(block_a).next
+            current_block = get_block(block_a)
 
             # Exit loop if block is terminal
-            if block_a.is_terminal():
+            if current_block.is_terminal():
                 break
+            block_a = current_block.next
 
         # Follow block B path
         while block_b is not None:
-            b_next.append(block_b)
-            block_b = self.__itemizer.get_block(block_b).next
+            b_next.add(block_b)
+            current_block = get_block(block_b)
+
             # Exit loop if block is terminal
-            if block_b.is_terminal():
+            if current_block.is_terminal():
                 break
+            block_b = current_block.next
 
         # Keep same elements and return the first one
         for a in a_next:
-            same = False
-            for b in b_next:
-                if a==b:
-                    return a
+            if a in b_next:
+                return a
 
         # No merging block, meaning each path goes its own way
         return None
@@ -12,6 +12,11 @@ class InvalidBeamHeader(Exception):
     '''Invalid BEAM file header.
     '''
 
+class SharedBeamInstruction(Exception):
+    '''Attempt to modify an instruction shared by all the occurrences of its
+    opcode.
+    '''
+
 class UnsupportedBeamExt(Exception):
     def __init__(self, tag):
         super().__init__()
@@ -1,9 +1,17 @@
 '''BEAM external term decoding
 '''
-from struct import unpack
+from struct import Struct
 from .exceptions import UnsupportedBeamExt
 
+# Precompiled formats used by term parsers
+U16 = Struct('>H')
+U32 = Struct('>I')
+U8U8 = Struct('>BB')
+U32U8 = Struct('>IB')
+
 class BeamValueExt(object):
+    __slots__ = ('__value',)
+
     def __init__(self, value):
         self.__value = value
 
@@ -19,54 +27,70 @@ class BeamValueExt(object):
 
 class BeamAtomCacheRef(BeamValueExt):
 
+    __slots__ = ()
+
     def __init__(self, ref_index):
         super().__init__(ref_index)
 
     @staticmethod
-    def parse(content):
-        return BeamAtomCacheRef(unpack('>B', content.read(1))[0])
+    def parse(data, offset):
+        return ATOM_CACHE_REFS[data[offset]], offset + 1
 
     def __str__(self):
         return 'BeamAtomCacheRef()'
 
+# Atom cache references are immutable and indexed by a single byte, intern them
+ATOM_CACHE_REFS = tuple(BeamAtomCacheRef(i) for i in range(256))
+
 class BeamSmallIntegerExt(BeamValueExt):
 
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
     @staticmethod
-    def parse(content):
-        return BeamSmallIntegerExt(unpack('>B', content.read(1))[0])
+    def parse(data, offset):
+        return SMALL_INTEGERS[data[offset]], offset + 1
 
     def __str__(self):
         return '0x%x' % self.value
 
+# Same goes for small integers
+SMALL_INTEGERS = tuple(BeamSmallIntegerExt(i) for i in range(256))
+
 class BeamIntegerExt(BeamValueExt):
 
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
     @staticmethod
-    def parse(content):
-        return BeamIntegerExt(unpack('>I', content.read(4))[0])
+    def parse(data, offset):
+        return BeamIntegerExt(U32.unpack_from(data, offset)[0]), offset + 4
 
     def __str__(self):
         return '0x%x' % self.value
 
 class BeamFloatExt(BeamValueExt):
 
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
     @staticmethod
-    def parse(content):
-        return BeamFloatExt(content.read(31))
+    def parse(data, offset):
+        return BeamFloatExt(data[offset:offset + 31]), offset + 31
 
     def __str__(self):
         return '%s' % self.value
 
 class BeamSmallTupleExt(object):
 
+    __slots__ = ('__members',)
+
     def __init__(self, members):
         self.__members = members
 
@@ -78,12 +102,15 @@ class BeamSmallTupleExt(object):
         return len(self.__members)
 
     @staticmethod
-    def parse(content):
-        tuple_value = []
-        arity = unpack('>B', content.read(1))[0]
-        for i in range(arity):
-            tuple_value.append(BeamExtTerm.parse(content, marker_required=False))
-        return BeamSmallTupleExt(tuple_value)
+    def parse(data, offset):
+        parse = BeamExtTerm.parse
+        arity = data[offset]
+        offset += 1
+        members = []
+        for _ in range(arity):
+            member, offset = parse(data, offset, False)
+            members.append(member)
+        return BeamSmallTupleExt(members), offset
 
     def __repr__(self):
         return '(%s)' % ', '.join(map(str, self.__members))
@@ -92,16 +119,21 @@ class BeamSmallTupleExt(object):
         return '(%s)' % ', '.join(map(str, self.__members))
 
 class BeamLargeTupleExt(BeamSmallTupleExt):
+    __slots__ = ()
+
     def __init__(self, members):
         super().__init__(members)
 
     @staticmethod
-    def parse(content):
-        tuple_value = []
-        arity = unpack('>I', content.read(4))[0]
-        for i in range(arity):
-            tuple_value.append(BeamExtTerm.parse(content, marker_required=False))
-        return BeamLargeTupleExt(tuple_value)
+    def parse(data, offset):
+        parse = BeamExtTerm.parse
+        arity = U32.unpack_from(data, offset)[0]
+        offset += 4
+        members = []
+        for _ in range(arity):
+            member, offset = parse(data, offset, False)
+            members.append(member)
+        return BeamLargeTupleExt(members), offset
 
     def __repr__(self):
         return '(%s)' % ', '.join(map(str, self.members))
@@ -110,6 +142,8 @@ class BeamLargeTupleExt(BeamSmallTupleExt):
         return '(%s)' % ', '.join(map(str, self.members))
 
 class BeamMapExt(object):
+    __slots__ = ('__map',)
+
     def __init__(self):
         self.__map = {}
 
@@ -119,16 +153,18 @@ class BeamMapExt(object):
         self.__map[key] = value
 
     @staticmethod
-    def parse(content):
+    def parse(data, offset):
         map_obj = BeamMapExt()
+        parse = BeamExtTerm.parse
 
-        arity = unpack('>I', content.read(4))[0]
-        for i in range(arity):
-            key = BeamExtTerm.parse(content, marker_required=False)
-            value = BeamExtTerm.parse(content, marker_required=False)
+        arity = U32.unpack_from(data, offset)[0]
+        offset += 4
+        for _ in range(arity):
+            key, offset = parse(data, offset, False)
+            value, offset = parse(data, offset, False)
             map_obj.set(key, value)
 
-        return map_obj
+        return map_obj, offset
 
     def __repr__(self):
         key_values = []
@@ -141,6 +177,8 @@ class BeamMapExt(object):
 
 class BeamListExt(object):
 
+    __slots__ = ('__items',)
+
     def __init__(self):
         self.__items = []
 
@@ -156,70 +194,88 @@ class BeamListExt(object):
         raise IndexError
 
     @staticmethod
-    def parse(content):
+    def parse(data, offset):
         '''Parse list content
         '''
         list_obj = BeamListExt()
+        parse = BeamExtTerm.parse
 
-        list_size = unpack('>I', content.read(4))[0]
-        for i in range(list_size):
-            list_obj.append(BeamExtTerm.parse(content, marker_required=False))
-        tail = BeamExtTerm.parse(content, marker_required=False)
+        list_size = U32.unpack_from(data, offset)[0]
+        offset += 4
+        for _ in range(list_size):
+            item, offset = parse(data, offset, False)
+            list_obj.append(item)
+        tail, offset = parse(data, offset, False)
 
-        return list_obj
+        return list_obj, offset
 
     def __str__(self):
         members = ', '.join([str(i) for i in self.__items])
         return "[%s]" % members
 
 class BeamNilExt(object):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
     @staticmethod
-    def parse(content):
-        return BeamNilExt()
+    def parse(data, offset):
+        return NIL_EXT, offset
 
     def __str__(self):
         return 'NIL'
 
+# NIL carries no state, a single instance is enough
+NIL_EXT = BeamNilExt()
+
 class BeamStringExt(BeamValueExt):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
     @staticmethod
-    def parse(content):
-        length = unpack('>H', content.read(2))[0]
-        return BeamStringExt(content.read(length))
+    def parse(data, offset):
+        length = U16.unpack_from(data, offset)[0]
+        offset += 2
+        return BeamStringExt(data[offset:offset + length]), offset + length
 
     def __repr__(self):
         return '"%s"' % self.value.decode('latin1').replace('\n', "\\n").replace('\r', "\\r")
 
 class BeamBinaryExt(BeamValueExt):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
     @staticmethod
-    def parse(content):
-        length = unpack('>I', content.read(4))[0]
-        return BeamBinaryExt(content.read(length))
+    def parse(data, offset):
+        length = U32.unpack_from(data, offset)[0]
+        offset += 4
+        return BeamBinaryExt(data[offset:offset + length]), offset + length
 
     def __repr__(self):
         return '%s' % self.value
 
 class BeamSmallBigExt(object):
+    __slots__ = ('__sign', '__value', '__int_value')
+
     def __init__(self, sign, value):
         self.__sign = sign
         self.__value = value
+        self.__int_value = None
 
     @property
     def value(self):
-        value = 0
-        for i,v in enumerate(self.__value):
-            value += v*(256**i)
-        if self.__sign==1:
-            value = -value
-        return value
+        # Digits are stored little-endian, decode them once
+        if self.__int_value is None:
+            value = int.from_bytes(self.__value, 'little')
+            if self.__sign==1:
+                value = -value
+            self.__int_value = value
+        return self.__int_value
 
     def __repr__(self):
         return '%s(%d)' % (
@@ -228,44 +284,51 @@ class BeamSmallBigExt(object):
         )
 
     @staticmethod
-    def parse(content):
-        n = unpack('>B', content.read(1))[0]
-        sign = unpack('>B', content.read(1))[0]
-        value = content.read(n)
-        return BeamSmallBigExt(sign, value)
+    def parse(data, offset):
+        n, sign = U8U8.unpack_from(data, offset)
+        offset += 2
+        return BeamSmallBigExt(sign, data[offset:offset + n]), offset + n
 
 class BeamLargeBigExt(BeamSmallBigExt):
+    __slots__ = ()
+
     def __init__(self, sign, value):
         super().__init__(sign, value)
 
     @staticmethod
-    def parse(content):
-        n = unpack('>B', content.read(4))[0]
-        sign = unpack('>B', content.read(1))[0]
-        value = content.read(n)
-        return BeamLargeBigExt(sign, value)        
+    def parse(data, offset):
+        n, sign = U32U8.unpack_from(data, offset)
+        offset += 5
+        return BeamLargeBigExt(sign, data[offset:offset + n]), offset + n
 
 class BeamNewFloatExt(BeamValueExt):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
     @staticmethod
-    def parse(content):
-        return BeamNewFloatExt(content.read(8))
+    def parse(data, offset):
+        return BeamNewFloatExt(data[offset:offset + 8]), offset + 8
 
 class BeamAtomUtf8Ext(BeamValueExt):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
     @staticmethod
-    def parse(content):
-        length = unpack('>H', content.read(2))[0]
-        return BeamAtomUtf8Ext(content.read(length))
+    def parse(data, offset):
+        length = U16.unpack_from(data, offset)[0]
+        offset += 2
+        return BeamAtomUtf8Ext(data[offset:offset + length]), offset + length
 
     def __str__(self):
         return str(self.value.decode('utf-8'))
     
 class BeamSmallAtomUtf8Ext(BeamAtomUtf8Ext):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
@@ -273,15 +336,20 @@ class BeamSmallAtomUtf8Ext(BeamAtomUtf8Ext):
         return str(self.value.decode('utf-8'))
 
     @staticmethod
-    def parse(content):
-        length = unpack('>B', content.read(1))[0]
-        return BeamSmallAtomUtf8Ext(content.read(length))
+    def parse(data, offset):
+        length = data[offset]
+        offset += 1
+        return BeamSmallAtomUtf8Ext(data[offset:offset + length]), offset + length
 
 class BeamAtomExt(BeamAtomUtf8Ext):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
 class BeamSmallAtomExt(BeamAtomUtf8Ext):
+    __slots__ = ()
+
     def __init__(self, value):
         super().__init__(value)
 
@@ -300,6 +368,7 @@ class BeamExtTerm(object):
         108: BeamListExt,
         109: BeamBinaryExt,
         110: BeamSmallBigExt,
+        111: BeamLargeBigExt,
         115: BeamSmallAtomExt,
         116: BeamMapExt,
         118: BeamAtomUtf8Ext,
@@ -307,19 +376,28 @@ class BeamExtTerm(object):
     }
 
     @staticmethod
-    def parse(content, marker_required=True):
-        '''Parse external term
+    def parse(data, offset=0, marker_required=True):
+        '''Parse external term stored in `data` (bytes) at `offset`.
+
+        Return a tuple (term, offset of the next byte following this term).
         '''
-        # Read marker and tag
+        # Read marker and tag
         if marker_required:
-            marker, tag = unpack('>BB', content.read(2))
+            marker, tag = U8U8.unpack_from(data, offset)
+            offset += 2
             assert marker == 131
         else:
-            tag = unpack('>B', content.read(1))[0]
+            tag = data[offset]
+            offset += 1
 
-        # Parse depending on tag
-        if tag in BeamExtTerm.PARSERS:
-            parser = BeamExtTerm.PARSERS[tag]
-            return parser.parse(content)
-        else:
+        # Parse depending on tag
+        parser = PARSERS_TABLE[tag]
+        if parser is None:
             raise UnsupportedBeamExt(tag)
+        return parser(data, offset)
+
+# Parse functions indexed by tag byte, built from `BeamExtTerm.PARSERS`
+PARSERS_TABLE = tuple(
+    BeamExtTerm.PARSERS[tag].parse if tag in BeamExtTerm.PARSERS else None
+    for tag in range(256)
+)
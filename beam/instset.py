@@ -1,41 +1,124 @@
 '''BEAM instructions set
 '''
-import traceback
-from struct import unpack
+from itertools import repeat
+from operator import attrgetter
+from .exceptions import SharedBeamInstruction
 from .utils import BeamCompactTerm
 from .types import BeamLabel, BeamExtList, BeamLiteral, BeamInteger
 
+# Instruction kinds, used by analysis code to dispatch on instructions
+KIND_DEFAULT = 0
+KIND_LABEL = 1
+KIND_FUNC_INFO = 2
+KIND_CALL = 3
+KIND_CALL_EXT = 4
+KIND_SELECT_VAL = 5
+KIND_SELECT_TUPLE_ARITY = 6
+
+# Operand specs used by declarative instruction formats (see `opcode`)
+OP_RAW = 0      # operand as is
+OP_MODVAL = 1   # module.get_value(operand)
+OP_INDEX = 2    # operand.index (label, literal)
+OP_ATOM = 3     # module.get_atom(operand.index)
+OP_IMPORT = 4   # module.get_import_str(operand.index)
+OP_EXPORT = 5   # module.get_export_str(operand.index)
+OP_VALUE = 6    # instruction.get_value(operand position)
+
+# Instructions are rendered as a padded mnemonic followed by their operands
+INST_TEMPLATE = '\t{:20}'
+
+# Immediate value getters used by `BeamInst.get_value`, indexed by operand type
+VALUE_GETTERS = {
+    BeamLiteral: attrgetter('index'),
+    BeamLabel: attrgetter('index'),
+    BeamInteger: attrgetter('value'),
+}
+
+# Default templates indexed by number of operands (arity is at most 8)
+DEFAULT_TEMPLATES = tuple(
+    INST_TEMPLATE + ', '.join(['{}'] * count) for count in range(9)
+)
+
 class BeamInstsRegistry(object):
 
-    INSTS_CLAZZ = {}
-    INSTS_ARITY = {}
+    # Opcodes are encoded on a single byte, registered classes and arities
+    # are directly indexed by opcode. All tables are frozen by `freeze()`
+    # once all classes are known (arities fit in a byte, hence bytes).
+    INSTS_CLAZZ = [None] * 256
+    INSTS_ARITY = bytearray(256)
+
+    # (arity, class, shared instance) tuples used by `decode()`
+    INSTS_DECODERS = [None] * 256
 
     @staticmethod
     def register(clazz, opcode, arity):
         BeamInstsRegistry.INSTS_CLAZZ[opcode] = clazz
         BeamInstsRegistry.INSTS_ARITY[opcode] = arity
 
+        # Instructions without operands are all alike, decode them as a
+        # single immutable instance (see `BeamInst.is_shared()`).
+        shared = None
+        if arity == 0:
+            shared = clazz()
+            shared._operands = ()
+            shared._annotations = ()
+        BeamInstsRegistry.INSTS_DECODERS[opcode] = (arity, clazz, shared)
+
+    @staticmethod
+    def freeze():
+        '''Freeze opcode tables, no instruction can be registered anymore.
+        '''
+        BeamInstsRegistry.INSTS_CLAZZ = tuple(BeamInstsRegistry.INSTS_CLAZZ)
+        BeamInstsRegistry.INSTS_ARITY = bytes(BeamInstsRegistry.INSTS_ARITY)
+        BeamInstsRegistry.INSTS_DECODERS = tuple(
+            BeamInstsRegistry.INSTS_DECODERS
+        )
+
     @staticmethod
     def arity(opcode):
-        if opcode in BeamInstsRegistry.INSTS_ARITY:
-            return BeamInstsRegistry.INSTS_ARITY[opcode]
-        raise IndexError
+        if BeamInstsRegistry.INSTS_CLAZZ[opcode] is None:
+            raise IndexError
+        return BeamInstsRegistry.INSTS_ARITY[opcode]
 
     @staticmethod
     def inst_class(opcode):
-        if opcode in BeamInstsRegistry.INSTS_CLAZZ:
-            return BeamInstsRegistry.INSTS_CLAZZ[opcode]
-        raise BeamInst
+        clazz = BeamInstsRegistry.INSTS_CLAZZ[opcode]
+        if clazz is None:
+            raise IndexError
+        return clazz
+
+    @staticmethod
+    def decode(opcode, content):
+        '''Create an instruction for the given opcode and read its operands
+        from content.
+
+        Return None if opcode is unknown.
+        '''
+        decoder = BeamInstsRegistry.INSTS_DECODERS[opcode]
+        if decoder is None:
+            return None
+        arity, clazz, shared = decoder
+        if shared is not None:
+            return shared
+        return clazz(map(BeamCompactTerm.read_term, repeat(content, arity)))
 
 class opcode(object):
 
-    def __init__(self, opcode_num, arity):
+    def __init__(self, opcode_num, arity, mnemonic, fmt=None, specs=()):
         self.__opcode = opcode_num
         self.__arity = arity
+        self.__mnemonic = mnemonic
+        self.__fmt = fmt
+        self.__specs = specs
 
     def __call__(self, clazz):
         clazz.opcode = self.__opcode
         clazz.arity = self.__arity
+        clazz.mnemonic = self.__mnemonic
+        if self.__fmt is not None:
+            clazz.fmt = self.__fmt
+            clazz.full_fmt = INST_TEMPLATE + self.__fmt
+            clazz.specs = self.__specs
         BeamInstsRegistry.register(clazz, self.__opcode, self.__arity)
         return clazz
 
@@ -45,6 +128,18 @@ class jumpref_op(object):
 
     def __call__(self, clazz):
         clazz.jumprefs = self.__targets
+        if len(self.__targets) == 1:
+            # Most branches reference a single operand, skip the generic loop
+            clazz.jumpref = self.__targets[0]
+            clazz.jump_targets = BeamInst.single_jump_targets
+        return clazz
+
+class inst_kind(object):
+    def __init__(self, kind):
+        self.__kind = kind
+
+    def __call__(self, clazz):
+        clazz.kind = self.__kind
         return clazz
 
 def exit_func(clazz):
@@ -55,47 +150,71 @@ def branch(clazz):
     clazz.is_branch = True
     return clazz
 
+# Shared result for instructions without jump targets
+NO_TARGETS = ()
+
+def label_targets(operand):
+    '''Extract label indexes referenced by a jump operand.
+    '''
+    if isinstance(operand, BeamLabel):
+        return (operand.index,)
+    elif isinstance(operand, BeamExtList):
+        return tuple(v.index for v in operand if isinstance(v, BeamLabel))
+    return NO_TARGETS
+
 class BeamInst(object):
     '''Basic instruction class.
     '''
 
-    jumprefs = []
+    jumprefs = ()
+    jumpref = None
     exit_func = False
     is_branch = False
+    __slots__ = ('_operands', '_annotations')
 
-    def __init__(self, mnemonic):
-        self.__mnemonic = mnemonic
-        self.__operands = []
-        self.__annotations = []
+    kind = KIND_DEFAULT
+    fmt = None
+    full_fmt = None
+    specs = ()
+
+    def __init__(self, operands=()):
+        # Operands are kept in a tuple, instructions are not modified once
+        # decoded
+        self._operands = tuple(operands)
+        self._annotations = []
 
     @property
     def mnemo(self):
         """Retrieve the instruction mnemonic
         """
-        return self.__mnemonic
+        return self.mnemonic
 
     @property
     def operands(self):
         """Retrieve instruction operands
         """
-        return self.__operands
+        return self._operands
 
     @property
     def jump_targets(self):
         '''Check declared jumprefs operands
         '''
-        targets = []
+        if not self.jumprefs:
+            return NO_TARGETS
+        targets = ()
         for ref in self.jumprefs:
-            if ref < len(self.__operands):
-                operand = self.__operands[ref]
-                if isinstance(operand, BeamLabel):
-                    targets.append(operand.index)
-                elif isinstance(operand, BeamExtList):
-                    for v in operand:
-                        if isinstance(v, BeamLabel):
-                            targets.append(v.index)
+            if ref < len(self._operands):
+                targets += label_targets(self._operands[ref])
         return targets
 
+    @property
+    def single_jump_targets(self):
+        '''Check the only declared jumprefs operand
+        '''
+        if self.jumpref < len(self._operands):
+            return label_targets(self._operands[self.jumpref])
+        return NO_TARGETS
+
     def is_terminal(self):
         '''Check if this instruction is terminal.
         '''
@@ -106,53 +225,89 @@ class BeamInst(object):
         '''
         return (self.is_branch  and (len(self.jump_targets) > 0))
 
+    def is_shared(self):
+        '''Check if this instruction is the single instance shared by all the
+        occurrences of its opcode (decoded instructions without operands).
+
+        Shared instances keep their (empty) annotations in a tuple.
+        '''
+        return self._annotations.__class__ is tuple
+
     def add_operand(self, operand):
         """Add operand to the list of the operands.
+
+        Raises SharedBeamInstruction if this instruction is shared.
         """
-        self.__operands.append(operand)
+        if self.is_shared():
+            raise SharedBeamInstruction
+        self._operands += (operand,)
 
     def add_annotation(self, annotation):
         """Add annotation to this instruction. Annotations are outputed before
         the instruction mnemonic and operand(s).
+
+        Raises SharedBeamInstruction if this instruction is shared.
         """
-        self.__annotations.append(annotation)
+        if self.is_shared():
+            raise SharedBeamInstruction
+        self._annotations.append(annotation)
 
     def __repr__(self):
         """Retrieve the representation of this instruction, aka disassembled
         instruction.
         """
-        operands = ' '.join([str(operand) for operand in self.__operands])
         return '%s %s' % (
-            self.__mnemonic,
-            operands
+            self.mnemonic,
+            ' '.join(map(str, self._operands))
         )
 
-    def format(self, module, format, operands):
-        '''Format instruction based on module, format string and the provided
-        operands.
-        '''
-        annotations = '\n'.join(self.__annotations)
-        operands = list(operands)
-        operands.insert(0, self.mnemo)
-        return annotations + str('\t{:20}' + format).format(*operands)
-
     def get_value(self, operand):
         """Get operand value, whenever it's possible.
         """
-        op = self.__operands[operand]
-        if isinstance(op, BeamLiteral):
-            return op.index
-        elif isinstance(op, BeamInteger):
-            return op.value
+        op = self._operands[operand]
+        getter = VALUE_GETTERS.get(op.__class__)
+        if getter is not None:
+            return getter(op)
 
     def to_string(self, module):
-        '''Resolve operands
+        '''Resolve operands, following the format and operand specs declared
+        through `opcode` if any.
         '''
-        # Generate default format for the number of operands we have
-        op_format = ', '.join(['{}' for i in range(len(self.operands))])
-        return self.format(module, op_format, [
-            module.get_value(x) for  x in self.operands
-        ])
+        operands = self._operands
+        if self.fmt is None:
+            # Use the default format for the number of operands we have
+            get_value = module.get_value
+            count = len(operands)
+            if count < len(DEFAULT_TEMPLATES):
+                template = DEFAULT_TEMPLATES[count]
+            else:
+                template = INST_TEMPLATE + ', '.join(['{}'] * count)
+            return '\n'.join(self._annotations) + template.format(
+                self.mnemonic, *[get_value(x) for x in operands]
+            )
+
+        get_value = module.get_value
+        args = []
+        append = args.append
+        for i, spec in enumerate(self.specs):
+            operand = operands[i]
+            if spec == OP_INDEX:
+                append(operand.index)
+            elif spec == OP_MODVAL:
+                append(get_value(operand))
+            elif spec == OP_RAW:
+                append(operand)
+            elif spec == OP_ATOM:
+                append(module.get_atom(operand.index))
+            elif spec == OP_IMPORT:
+                append(module.get_import_str(operand.index))
+            elif spec == OP_EXPORT:
+                append(module.get_export_str(operand.index))
+            else:
+                append(self.get_value(i))
+        return '\n'.join(self._annotations) + self.full_fmt.format(
+            self.mnemonic, *args
+        )
 
     @classmethod
     def parse_operands(cls, content):
@@ -164,21 +319,21 @@ class BeamInst(object):
         return inst
 
 
-@opcode(1, 1)
+@inst_kind(KIND_LABEL)
+@opcode(1, 1, 'label')
 class BeamInstLabel(BeamInst):
-    def __init__(self):
-        super().__init__('label')
-        self.__number = None
+    __slots__ = ()
 
     def to_string(self, module):
         '''Label has only one operand, a literal indicating the label number.
         '''
         return 'label%d:' % int(self.operands[0].index)
 
-@opcode(2, 3)
+@inst_kind(KIND_FUNC_INFO)
+@opcode(2, 3, 'func_info', fmt='{}, {}, {:d}',
+        specs=(OP_ATOM, OP_ATOM, OP_INDEX))
 class BeamInstFuncInfo(BeamInst):
-    def __init__(self):
-        super().__init__('func_info')
+    __slots__ = ()
 
     @property
     def module_atom(self):
@@ -198,201 +353,75 @@ class BeamInstFuncInfo(BeamInst):
         """
         return self.operands[2].index
 
-    def to_string(self, module):
-        '''Function info operands:
-        - first operand is an atom referencing the module name
-        - second operand is an atom referencing the function name
-        - third operand is a literal representing the arity
-        '''
-        return self.format(module, '{}, {}, {:d}', [
-            module.get_atom(self.operands[0].index),
-            module.get_atom(self.operands[1].index),
-            self.operands[2].index
-        ])
-
 @exit_func
-@opcode(3, 0)
+@opcode(3, 0, 'int_code_end')
 class BeamInstIntCodeEnd(BeamInst):
-    def __init__(self):
-        super().__init__('int_code_end')
+    __slots__ = ()
 
-@opcode(4, 2)
+@inst_kind(KIND_CALL)
+@opcode(4, 2, 'call', fmt='{:d}, label{:d}', specs=(OP_INDEX, OP_INDEX))
 class BeamInstCall(BeamInst):
-    def __init__(self):
-        super().__init__('call')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}, label{:d}', [
-            self.operands[0].index,
-            self.operands[1].index
-        ])
+    __slots__ = ()
 
-@opcode(5, 3)
+@inst_kind(KIND_CALL)
+@opcode(5, 3, 'call_last', fmt='{:d}, label{:d}, {:d}',
+        specs=(OP_INDEX, OP_INDEX, OP_INDEX))
 class BeamInstCallLast(BeamInst):
-    def __init__(self):
-        super().__init__('call_last')
-
-    def to_string(self, module):
-        '''Operands:
-        - integer (literal)
-        - label
-        - integer (literal)
-        '''
-        return self.format(module, '{:d}, label{:d}, {:d}', [
-            self.operands[0].index,
-            self.operands[1].index,
-            self.operands[2].index
-        ])
+    __slots__ = ()
 
-@opcode(6, 2)
+@inst_kind(KIND_CALL)
+@opcode(6, 2, 'call_only', fmt='{:d}, label{:d}', specs=(OP_INDEX, OP_INDEX))
 class BeamInstCallOnly(BeamInst):
-    def __init__(self):
-        super().__init__('call_only')
+    __slots__ = ()
 
-    def to_string(self, module):
-        '''Operands:
-        - integer (literal)
-        - label
-        - integer (literal)
-        '''
-        return self.format(module, '{:d}, label{:d}', [
-            self.operands[0].index,
-            self.operands[1].index
-        ])
-
-@opcode(7, 2)
+@inst_kind(KIND_CALL_EXT)
+@opcode(7, 2, 'call_ext', fmt='{:d}, {}', specs=(OP_INDEX, OP_IMPORT))
 class BeamInstCallExt(BeamInst):
-    def __init__(self):
-        super().__init__('call_ext')
-
-    def to_string(self, module):
-        '''Operands:
-        - literal (int)
-        - import func
-        '''
-        return self.format(module, '{:d}, {}', [
-            self.operands[0].index,
-            module.get_import_str(self.operands[1].index)
-        ])
+    __slots__ = ()
 
-@opcode(8, 3)
+@inst_kind(KIND_CALL_EXT)
+@opcode(8, 3, 'call_ext_last', fmt='0x{:X}, {}, 0x{:X}',
+        specs=(OP_INDEX, OP_IMPORT, OP_INDEX))
 class BeamInstCallExtLast(BeamInst):
-    def __init__(self):
-        super().__init__('call_ext_last')
-
-    def to_string(self, module):
-        return self.format(module, '0x{:X}, {}, 0x{:X}', [
-            self.operands[0].index,
-            module.get_import_str(self.operands[1].index),
-            self.operands[2].index
-        ])
+    __slots__ = ()
 
 
-@opcode(9, 2)
+@opcode(9, 2, 'bif0', fmt='{}, {}', specs=(OP_EXPORT, OP_MODVAL))
 class BeamInstBif0(BeamInst):
-    def __init__(self):
-        super().__init__('bif0')
-
-    def to_string(self, module):
-        return self.format(module, '{}, {}', [
-            module.get_export_str(self.operands[0].index),
-            module.get_value(self.operands[1]),
-        ])
+    __slots__ = ()
 
-@opcode(10, 4)
+@opcode(10, 4, 'bif1', fmt='label{:d}, {:d}, {}, {}',
+        specs=(OP_INDEX, OP_INDEX, OP_MODVAL, OP_MODVAL))
 class BeamInstBif1(BeamInst):
-    def __init__(self):
-        super().__init__('bif1')
-
-    def to_string(self, module):
-        '''Operands:
-        - Label
-        - Integer
-        - Literal
-        - reg
-        - Integer
-        - reg
-        '''
-        return self.format(module, 'label{:d}, {:d}, {}, {}', [
-            self.operands[0].index,
-            self.operands[1].index,
-            module.get_value(self.operands[2]),
-            module.get_value(self.operands[3])
-        ])
+    __slots__ = ()
 
-@opcode(11, 5)
+@opcode(11, 5, 'bif2', fmt='label{:d}, {:d}, {}, {}, {}',
+        specs=(OP_INDEX, OP_INDEX, OP_MODVAL, OP_MODVAL, OP_MODVAL))
 class BeamInstBif2(BeamInst):
-    def __init__(self):
-        super().__init__('bif2')
-
-    def to_string(self, module):
-        '''Operands:
-        - Label
-        - Integer
-        - Literal
-        - reg
-        - Integer
-        - reg
-        '''
-        return self.format(module, 'label{:d}, {:d}, {}, {}, {}', [
-            self.operands[0].index,
-            self.operands[1].index,
-            module.get_value(self.operands[2]),
-            module.get_value(self.operands[3]),
-            module.get_value(self.operands[4])
-        ])
+    __slots__ = ()
 
-@opcode(12, 2)
+@opcode(12, 2, 'allocate', fmt='{:d}, {:d}', specs=(OP_INDEX, OP_INDEX))
 class BeamInstAllocate(BeamInst):
-    def __init__(self):
-        super().__init__('allocate')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}, {:d}', [
-            self.operands[0].index,
-            self.operands[1].index
-        ])
+    __slots__ = ()
 
-@opcode(13, 3)
+@opcode(13, 3, 'allocate_heap', fmt='{}, {}, {}',
+        specs=(OP_VALUE, OP_MODVAL, OP_VALUE))
 class BeamInstAllocateHeap(BeamInst):
-    def __init__(self):
-        super().__init__('allocate_heap')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, '{}, {}, {}', [
-            self.get_value(0),
-            module.get_value(self.operands[1]),
-            self.get_value(2),
-        ])
-
-@opcode(14, 2)
+@opcode(14, 2, 'allocate_zero', fmt='{:d}, {:d}', specs=(OP_INDEX, OP_INDEX))
 class BeamIntAllocateZero(BeamInst):
-    def __init__(self):
-        super().__init__('allocate_zero')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}, {:d}', [
-            self.operands[0].index,
-            self.operands[1].index,
-        ])
+    __slots__ = ()
 
-@opcode(15, 3)
+@opcode(15, 3, 'allocate_heap_zero', fmt='{:d}, {:d}, {:d}',
+        specs=(OP_INDEX, OP_INDEX, OP_INDEX))
 class BeamInstAllocateHeapZero(BeamInst):
-    def __init__(self):
-        super().__init__('allocate_heap_zero')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}, {:d}, {:d}', [
-            self.operands[0].index,
-            self.operands[1].index,
-            self.operands[2].index,
-        ])
+    __slots__ = ()
 
 
-@opcode(16, 2)
+@opcode(16, 2, 'test_heap')
 class BeamInstTestHeap(BeamInst):
-    def __init__(self):
-        super().__init__('test_heap')
+    __slots__ = ()
 
     def to_string(self, module):
         '''Process each operand
@@ -406,51 +435,36 @@ class BeamInstTestHeap(BeamInst):
         else:
             second_operand = module.get_value(self.operands[1])
 
-        return self.format(module, '{}, {}', [
-            first_operand,
-            second_operand
-        ])
+        return '%s\t%-20s%s, %s' % (
+            '\n'.join(self._annotations), self.mnemonic,
+            first_operand, second_operand
+        )
+
+def simple_inst(name, opcode_num, arity, mnemonic):
+    '''Create an instruction class that only carries its opcode, arity and
+    mnemonic, and is displayed with the default operands format.
+    '''
+    clazz = type(name, (BeamInst,), {'__slots__': ()})
+    return opcode(opcode_num, arity, mnemonic)(clazz)
 
-@opcode(17, 1)
-class BeamInstInit(BeamInst):
-    def __init__(self):
-        super().__init__('init')
+BeamInstInit = simple_inst('BeamInstInit', 17, 1, 'init')
 
-@opcode(18, 1)
+@opcode(18, 1, 'deallocate', fmt='{:d}', specs=(OP_INDEX,))
 class BeamInstDeallocate(BeamInst):
-    def __init__(self):
-        super().__init__('deallocate')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}', [
-            self.operands[0].index
-        ])
+    __slots__ = ()
 
 @exit_func
-@opcode(19, 0)
+@opcode(19, 0, 'return')
 class BeamInstReturn(BeamInst):
-    def __init__(self):
-        super().__init__('return')
-
-@opcode(20, 0)
-class BeamInstSend(BeamInst):
-    def __init__(self):
-        super().__init__('send')
-
-@opcode(21, 0)
-class BeamInstRemoveMessage(BeamInst):
-    def __init__(self):
-        super().__init__('remove_message')
+    __slots__ = ()
 
-@opcode(22, 0)
-class BeamInstTimeout(BeamInst):
-    def __init__(self):
-        super().__init__('timeout')
+BeamInstSend = simple_inst('BeamInstSend', 20, 0, 'send')
+BeamInstRemoveMessage = simple_inst('BeamInstRemoveMessage', 21, 0, 'remove_message')
+BeamInstTimeout = simple_inst('BeamInstTimeout', 22, 0, 'timeout')
 
-@opcode(23, 2)
+@opcode(23, 2, 'loop_rec')
 class BeamInstLoopRec(BeamInst):
-    def __init__(self):
-        super().__init__('loop_rec')
+    __slots__ = ()
 
     def to_string(self, module):
         '''
@@ -458,327 +472,106 @@ class BeamInstLoopRec(BeamInst):
         second operand: reg
         '''
         if isinstance(self.operands[1], BeamLiteral):
-            return self.format(module, 'label{:d}, {:d}', [
-                self.operands[0].index,
-                self.operands[1].index,
-            ])
-        else:    
-            return self.format(module, 'label{:d}, {}', [
-                self.operands[0].index,
-                module.get_value(self.operands[1]),
-            ])
-
-@opcode(24, 1)
-class BeamInstLoopRecEnd(BeamInst):
-    def __init__(self):
-        super().__init__('loop_rec_end')
-
-@opcode(25, 1)
-class BeamInstWait(BeamInst):
-    def __init__(self):
-        super().__init__('wait')
-
-@opcode(26, 2)
-class BeamInstWaitTimeout(BeamInst):
-    def __init__(self):
-        super().__init__('wait_timeout')
-
-@opcode(27, 4)
-class BeamInstMPlus(BeamInst):
-    def __init__(self):
-        super().__init__('-m_plus')
-
-@opcode(28, 4)
-class BeamInstMMinus(BeamInst):
-    def __init__(self):
-        super().__init__('-m_minus')
-
-@opcode(29, 4)
-class BeamInstMTimes(BeamInst):
-    def __init__(self):
-        super().__init__('-m_times')
-
-@opcode(30, 4)
-class BeamInstMDiv(BeamInst):
-    def __init__(self):
-        super().__init__('-m_div')
-
-@opcode(31, 4)
-class BeamInstIntDiv(BeamInst):
-    def __init__(self):
-        super().__init__('-int_div')
-
-@opcode(32, 4)
-class BeamInstIntRem(BeamInst):
-    def __init__(self):
-        super().__init__('-int_rem')
-
-@opcode(33, 4)
-class BeamInstIntBand(BeamInst):
-    def __init__(self):
-        super().__init__('-int_band')
-
-@opcode(34, 4)
-class BeamInstIntBor(BeamInst):
-    def __init__(self):
-        super().__init__('-int_bor')
-
-@opcode(35, 4)
-class BeamInstIntBxor(BeamInst):
-    def __init__(self):
-        super().__init__('-int_bxor')
-
-
-@opcode(36, 4)
+            return '%s\t%-20slabel%d, %d' % (
+                '\n'.join(self._annotations), self.mnemonic,
+                self.operands[0].index, self.operands[1].index
+            )
+        else:
+            return '%s\t%-20slabel%d, %s' % (
+                '\n'.join(self._annotations), self.mnemonic,
+                self.operands[0].index, module.get_value(self.operands[1])
+            )
+
+BeamInstLoopRecEnd = simple_inst('BeamInstLoopRecEnd', 24, 1, 'loop_rec_end')
+BeamInstWait = simple_inst('BeamInstWait', 25, 1, 'wait')
+BeamInstWaitTimeout = simple_inst('BeamInstWaitTimeout', 26, 2, 'wait_timeout')
+
+BeamInstMPlus = simple_inst('BeamInstMPlus', 27, 4, '-m_plus')
+BeamInstMMinus = simple_inst('BeamInstMMinus', 28, 4, '-m_minus')
+BeamInstMTimes = simple_inst('BeamInstMTimes', 29, 4, '-m_times')
+BeamInstMDiv = simple_inst('BeamInstMDiv', 30, 4, '-m_div')
+BeamInstIntDiv = simple_inst('BeamInstIntDiv', 31, 4, '-int_div')
+BeamInstIntRem = simple_inst('BeamInstIntRem', 32, 4, '-int_rem')
+BeamInstIntBand = simple_inst('BeamInstIntBand', 33, 4, '-int_band')
+BeamInstIntBor = simple_inst('BeamInstIntBor', 34, 4, '-int_bor')
+BeamInstIntBxor = simple_inst('BeamInstIntBxor', 35, 4, '-int_bxor')
+
+@opcode(36, 4, '-int_bsl', fmt='{:d}, {}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL, OP_INDEX))
 class BeamInstBsl(BeamInst):
-    def __init__(self):
-        super().__init__('-int_bsl')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}, {}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2]),
-            self.operands[3].index,
-        ])
-
-@opcode(37, 4)
-class BeamInstBsr(BeamInst):
-    def __init__(self):
-        super().__init__('-int_bsr')
+    __slots__ = ()
 
-@opcode(38, 3)
-class BeamInstBnot(BeamInst):
-    def __init__(self):
-        super().__init__('-int_bnot')
+BeamInstBsr = simple_inst('BeamInstBsr', 37, 4, '-int_bsr')
+BeamInstBnot = simple_inst('BeamInstBnot', 38, 3, '-int_bnot')
 
-@opcode(39, 3)
+@opcode(39, 3, 'is_lt', fmt='label{:d}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsLt(BeamInst):
-    def __init__(self):
-        super().__init__('is_lt')
-
-    def to_string(self, module):
-        '''
-        first operand: label
-        second operand: reg
-        third operand: atom
-        '''
-        return self.format(module, 'label{:d}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2])
-        ])
+    __slots__ = ()
 
-@opcode(40, 3)
+@opcode(40, 3, 'is_ge', fmt='label{:d}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsGe(BeamInst):
-    def __init__(self):
-        super().__init__('is_ge')
-
-    def to_string(self, module):
-        '''
-        first operand: label
-        second operand: reg
-        third operand: atom
-        '''
-        return self.format(module, 'label{:d}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2])
-        ])
+    __slots__ = ()
 
 
-@opcode(41, 3)
+@opcode(41, 3, 'is_eq', fmt='label{:d}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsEq(BeamInst):
-    def __init__(self):
-        super().__init__('is_eq')
+    __slots__ = ()
 
-    def to_string(self, module):
-        '''
-        first operand: label
-        second operand: reg
-        third operand: atom
-        '''
-        return self.format(module, 'label{:d}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2])
-        ])
-
-@opcode(42, 3)
+@opcode(42, 3, 'is_ne', fmt='label{:d}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsNe(BeamInst):
-    def __init__(self):
-        super().__init__('is_ne')
+    __slots__ = ()
 
-    def to_string(self, module):
-        '''
-        first operand: label
-        second operand: reg
-        third operand: atom
-        '''
-        return self.format(module, 'label{:d}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2])
-        ])
-
-@opcode(43, 3)
+@opcode(43, 3, 'is_eq_exact', fmt='label{:d}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsEqExact(BeamInst):
-    def __init__(self):
-        super().__init__('is_eq_exact')
-
-    def to_string(self, module):
-        '''
-        first operand: label
-        second operand: reg
-        third operand: atom
-        '''
-        return self.format(module, 'label{:d}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2])
-        ])
+    __slots__ = ()
 
 
-@opcode(44, 3)
+@opcode(44, 3, 'is_ne_exact', fmt='label{:d}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsNeExact(BeamInst):
-    def __init__(self):
-        super().__init__('is_ne_exact')
-
-    def to_string(self, module):
-        '''
-        first operand: label
-        second operand: reg
-        third operand: atom
-        '''
-        return self.format(module, 'label{:d}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2])
-        ])
-
-@opcode(45, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsInteger(BeamInst):
-    def __init__(self):
-        super().__init__('is_integer')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(46, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsFloat(BeamInst):
-    def __init__(self):
-        super().__init__('is_float')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(47, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsNumber(BeamInst):
-    def __init__(self):
-        super().__init__('is_number')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(48, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsAtom(BeamInst):
-    def __init__(self):
-        super().__init__('is_atom')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(49, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsPid(BeamInst):
-    def __init__(self):
-        super().__init__('is_pid')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(50, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsReference(BeamInst):
-    def __init__(self):
-        super().__init__('is_reference')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(51, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsPort(BeamInst):
-    def __init__(self):
-        super().__init__('is_port')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
+    __slots__ = ()
 
-@opcode(52, 2)
+def type_test(name, opcode_num, mnemonic):
+    '''Create a type test instruction class: these only differ by opcode and
+    mnemonic, and jump to their first operand (label) if the second one
+    (register) does not hold the expected type.
+    '''
+    clazz = type(name, (BeamInst,), {'__slots__': ()})
+    clazz = jumpref_op(0)(clazz)
+    clazz = branch(clazz)
+    return opcode(opcode_num, 2, mnemonic, fmt='label{:d}, {}',
+                  specs=(OP_INDEX, OP_RAW))(clazz)
+
+BeamInstIsInteger = type_test('BeamInstIsInteger', 45, 'is_integer')
+BeamInstIsFloat = type_test('BeamInstIsFloat', 46, 'is_float')
+BeamInstIsNumber = type_test('BeamInstIsNumber', 47, 'is_number')
+BeamInstIsAtom = type_test('BeamInstIsAtom', 48, 'is_atom')
+BeamInstIsPid = type_test('BeamInstIsPid', 49, 'is_pid')
+BeamInstIsReference = type_test('BeamInstIsReference', 50, 'is_reference')
+BeamInstIsPort = type_test('BeamInstIsPort', 51, 'is_port')
+
+@opcode(52, 2, 'is_nil')
 @branch
 @jumpref_op(0)
 class BeamInstIsNil(BeamInst):
-    def __init__(self):
-        super().__init__('is_nil')
+    __slots__ = ()
 
     def to_string(self, module):
         '''First operand is a label, second a register
@@ -788,483 +581,214 @@ class BeamInstIsNil(BeamInst):
         else:
             label_ref = self.operands[0].index
         if isinstance(self.operands[1], BeamLiteral):
-            return self.format(module, 'label{:d}, {}', [
-                label_ref,
-                self.operands[1].index
-            ])
+            operand = self.operands[1].index
         else:
-            return self.format(module, 'label{:d}, {}', [
-                label_ref,
-                module.get_value(self.operands[1])
-            ])
-
-@opcode(53, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsBinary(BeamInst):
-    def __init__(self):
-        super().__init__('is_binary')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(54, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsConstant(BeamInst):
-    def __init__(self):
-        super().__init__('-is_constant')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(55, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsList(BeamInst):
-    def __init__(self):
-        super().__init__('is_list')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
-
-@opcode(56, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsNonEmptyList(BeamInst):
-    def __init__(self):
-        super().__init__('is_nonempty_list')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
+            operand = module.get_value(self.operands[1])
+        return '%s\t%-20slabel%d, %s' % (
+            '\n'.join(self._annotations), self.mnemonic, label_ref, operand
+        )
 
-@opcode(57, 2)
-@branch
-@jumpref_op(0)
-class BeamInstIsTuple(BeamInst):
-    def __init__(self):
-        super().__init__('is_tuple')
-    
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
+BeamInstIsBinary = type_test('BeamInstIsBinary', 53, 'is_binary')
+BeamInstIsConstant = type_test('BeamInstIsConstant', 54, '-is_constant')
+BeamInstIsList = type_test('BeamInstIsList', 55, 'is_list')
+BeamInstIsNonEmptyList = type_test('BeamInstIsNonEmptyList', 56, 'is_nonempty_list')
+BeamInstIsTuple = type_test('BeamInstIsTuple', 57, 'is_tuple')
 
-@opcode(58, 3)
+@opcode(58, 3, 'test_arity', fmt='label{:d}, {}, {:d}',
+        specs=(OP_INDEX, OP_RAW, OP_INDEX))
 @branch
 @jumpref_op(0)
 class BeamInstTestArity(BeamInst):
-    def __init__(self):
-        super().__init__('test_arity')
-
-    def to_string(self, module):
-        '''First operand is a label, second a register
-        '''
-        return self.format(module, 'label{:d}, {}, {:d}', [
-            self.operands[0].index,
-            self.operands[1],
-            self.operands[2].index
-        ])
+    __slots__ = ()
 
-@opcode(59, 3)
+@inst_kind(KIND_SELECT_VAL)
+@opcode(59, 3, 'select_val')
 @jumpref_op(2)
 class BeamInstSelectVal(BeamInst):
-    def __init__(self):
-        super().__init__('select_val')
+    __slots__ = ()
 
     def to_string(self, module):
         '''Convert select_val into something more readable
         '''
-        # Merge list items two by two as key=>value
-        cases = []
-        for i in range(int(len(self.operands[2])/2)):
-            cases.append((self.operands[2][i*2], self.operands[2][i*2+1]))
-        switches = ', '.join(['%s => label%d' % (module.get_value(k), v.index) for k,v in cases])
-        return self.format(module, '{}, label{:d}, [{}]', [
-            module.get_value(self.operands[0]),
-            self.operands[1].index,
-            switches
-        ])
+        # Merge list items two by two as key=>value
+        get_value = module.get_value
+        items = iter(self.operands[2])
+        switches = ', '.join([
+            '%s => label%d' % (get_value(k), v.index) for k, v in zip(items, items)
+        ])
+        return '%s\t%-20s%s, label%d, [%s]' % (
+            '\n'.join(self._annotations), self.mnemonic,
+            get_value(self.operands[0]), self.operands[1].index, switches
+        )
 
-@opcode(60, 3)
+@inst_kind(KIND_SELECT_TUPLE_ARITY)
+@opcode(60, 3, 'select_tuple_arity')
 class BeamInstSelectTupleArity(BeamInst):
-    def __init__(self):
-        super().__init__('select_tuple_arity')
+    __slots__ = ()
 
     def to_string(self, module):
         '''Convert select_val into something more readable
         '''
-        # Merge list items two by two as key=>value
-        cases = []
-        for i in range(int(len(self.operands[2])/2)):
-            cases.append((self.operands[2][i*2], self.operands[2][i*2+1]))
-        switches = ', '.join(['%d => label%d' % (k.index, v.index) for k,v in cases])
-        return self.format(module, '{} label{:d} [{}]', [
-            module.get_value(self.operands[0]),
-            self.operands[1].index,
+        # Merge list items two by two as key=>value
+        items = iter(self.operands[2])
+        switches = ', '.join([
+            '%d => label%d' % (k.index, v.index) for k, v in zip(items, items)
+        ])
+        return '%s\t%-20s%s label%d [%s]' % (
+            '\n'.join(self._annotations), self.mnemonic,
+            module.get_value(self.operands[0]), self.operands[1].index,
             switches
-        ])
+        )
 
-@opcode(61, 1)
+@opcode(61, 1, 'jump', fmt='label{:d}', specs=(OP_INDEX,))
 @jumpref_op(0)
 class BeamInstJump(BeamInst):
-    def __init__(self):
-        super().__init__('jump')
-
-    def to_string(self, module):
-        return self.format(module, 'label{:d}', [
-            self.operands[0].index
-        ])
+    __slots__ = ()
 
-@opcode(62, 2)
+@opcode(62, 2, 'catch', fmt='{} label{:d}', specs=(OP_RAW, OP_INDEX))
 class BeamInstCatch(BeamInst):
-    def __init__(self):
-        super().__init__('catch')
-
-    def to_string(self, module):
-        return self.format(module, '{} label{:d}', [
-            self.operands[0],
-            self.operands[1].index
-        ])
+    __slots__ = ()
 
-@opcode(63, 1)
-class BeamInstCatchEnd(BeamInst):
-    def __init__(self):
-        super().__init__('catch_end')
+BeamInstCatchEnd = simple_inst('BeamInstCatchEnd', 63, 1, 'catch_end')
 
 #
 # Moving, extracting, modifying
 # 
 
-@opcode(64, 2)
+@opcode(64, 2, 'move', fmt='{}, {}', specs=(OP_MODVAL, OP_MODVAL))
 class BeamInstMove(BeamInst):
-    def __init__(self):
-        super().__init__('move')
-
-    def to_string(self, module):
-        return self.format(module, '{}, {}', [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1])
-        ])
+    __slots__ = ()
 
-@opcode(65, 3)
-class BeamInstGetList(BeamInst):
-    def __init__(self):
-        super().__init__('get_list')
+BeamInstGetList = simple_inst('BeamInstGetList', 65, 3, 'get_list')
 
-@opcode(66, 3)
+@opcode(66, 3, 'get_tuple_element', fmt='{}, {:d}, {}',
+        specs=(OP_RAW, OP_INDEX, OP_RAW))
 class BeamInstGetTupleElement(BeamInst):
-    def __init__(self):
-        super().__init__('get_tuple_element')
-
-    def to_string(self, module):
-        '''First operand is a register, second one is an integer, third one
-        is a reg.
-        '''
-        return self.format(module, '{}, {:d}, {}',  [
-            self.operands[0],
-            self.operands[1].index,
-            self.operands[2]
-        ])
+    __slots__ = ()
 
-@opcode(67, 3)
+@opcode(67, 3, 'set_tuple_element', fmt='{}, {}, {}',
+        specs=(OP_MODVAL, OP_MODVAL, OP_INDEX))
 class BeamInstSetTupleElement(BeamInst):
-    def __init__(self):
-        super().__init__('set_tuple_element')
-
-    def to_string(self, module):
-        return self.format(module, '{}, {}, {}', [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1]),
-            self.operands[2].index,
-        ])
+    __slots__ = ()
 
 #
 # Building terms
 #
 
-@opcode(68, 3)
-class BeamInstPutString(BeamInst):
-    def __init__(self):
-        super().__init__('-put_string')
+BeamInstPutString = simple_inst('BeamInstPutString', 68, 3, '-put_string')
 
-@opcode(69, 3)
+@opcode(69, 3, 'put_list', fmt='{}, {}, {}',
+        specs=(OP_MODVAL, OP_MODVAL, OP_MODVAL))
 class BeamInstPutList(BeamInst):
-    def __init__(self):
-        super().__init__('put_list')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, '{}, {}, {}', map(module.get_value, self.operands[:3]))
-
-@opcode(70, 2)
+@opcode(70, 2, 'put_tuple', fmt='{:d}, {}', specs=(OP_INDEX, OP_RAW))
 class BeamInstPutTuple(BeamInst):
-    def __init__(self):
-        super().__init__('put_tuple')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}, {}', [
-            self.operands[0].index,
-            self.operands[1]
-        ])
+    __slots__ = ()
 
-@opcode(71, 1)
+@opcode(71, 1, 'put', fmt='{}', specs=(OP_MODVAL,))
 class BeamInstPut(BeamInst):
-    def __init__(self):
-        super().__init__('put')
-
-    def to_string(self, module):
-        return self.format(module, '{}', [
-            module.get_value(self.operands[0])
-        ])
+    __slots__ = ()
 
 #
 # Raising errors
 #
 
 @exit_func
-@opcode(72, 1)
+@opcode(72, 1, 'badmatch')
 class BeamInstBadMatch(BeamInst):
-    def __init__(self):
-        super().__init__('badmatch')
+    __slots__ = ()
 
 @exit_func
-@opcode(73, 0)
+@opcode(73, 0, 'if_end')
 class BeamInstIfEnd(BeamInst):
-    def __init__(self):
-        super().__init__('if_end')
+    __slots__ = ()
 
 @exit_func
-@opcode(74, 1)
+@opcode(74, 1, 'case_end')
 class BeamInstCaseEnd(BeamInst):
-    def __init__(self):
-        super().__init__('case_end')
+    __slots__ = ()
 
 #
 # 'fun' support
 #
 
-@opcode(75, 1)
+@opcode(75, 1, 'call_fun', fmt='{}', specs=(OP_INDEX,))
 class BeamInstCallFun(BeamInst):
-    def __init__(self):
-        super().__init__('call_fun')
-
-    def to_string(self, module):
-        return self.format(module, '{}', [
-            self.operands[0].index
-        ])
+    __slots__ = ()
 
-@opcode(76, 3)
-class BeamInstMakeFun(BeamInst):
-    def __init__(self):
-        super().__init__('-make_fun')
+BeamInstMakeFun = simple_inst('BeamInstMakeFun', 76, 3, '-make_fun')
 
-@opcode(77, 2)
+@opcode(77, 2, 'is_function', fmt='label{:d}, {}', specs=(OP_INDEX, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsFunction(BeamInst):
-    def __init__(self):
-        super().__init__('is_function')
-
-    def to_string(self, module):
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1])
-        ])
+    __slots__ = ()
 
 #
 # Late addition to R5
 #
 
-@opcode(78, 2)
+@inst_kind(KIND_CALL_EXT)
+@opcode(78, 2, 'call_ext_only', fmt='{:d}, {}', specs=(OP_INDEX, OP_IMPORT))
 class BeamInstCallExtOnly(BeamInst):
-    def __init__(self):
-        super().__init__('call_ext_only')
-
-    def to_string(self, module):
-        '''Operands:
-        - literal (int)
-        - import func
-        '''
-        return self.format(module, '{:d}, {}', [
-            self.operands[0].index,
-            module.get_import_str(self.operands[1].index)
-        ])
+    __slots__ = ()
 
 #
 # Binary matching (R7)
 #
 
-@opcode(79, 2)
-class BeamInstBsStartMatch(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_start_match')
+BeamInstBsStartMatch = simple_inst('BeamInstBsStartMatch', 79, 2, '-bs_start_match')
+BeamInstBsGetInteger = simple_inst('BeamInstBsGetInteger', 80, 5, '-bs_get_integer')
+BeamInstBsGetFloat = simple_inst('BeamInstBsGetFloat', 81, 5, '-bs_get_float')
+BeamInstBsGetBinary = simple_inst('BeamInstBsGetBinary', 82, 5, '-bs_get_binary')
+BeamInstBsSkipBits = simple_inst('BeamInstBsSkipBits', 83, 4, '-bs_skip_bits')
+BeamInstBsTestTail = simple_inst('BeamInstBsTestTail', 84, 2, '-bs_test_tail')
 
-@opcode(80, 5)
-class BeamInstBsGetInteger(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_get_integer')
 
-@opcode(81, 5)
-class BeamInstBsGetFloat(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_get_float')
-
-@opcode(82, 5)
-class BeamInstBsGetBinary(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_get_binary')
-
-@opcode(83, 4)
-class BeamInstBsSkipBits(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_skip_bits')
-
-@opcode(84, 2)
-class BeamInstBsTestTail(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_test_tail')
-
-
-@opcode(85, 1)
-class BeamInstBsSave(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_save')
-
-@opcode(86, 1)
-class BeamInstBsRestore(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_restore')
+BeamInstBsSave = simple_inst('BeamInstBsSave', 85, 1, '-bs_save')
+BeamInstBsRestore = simple_inst('BeamInstBsRestore', 86, 1, '-bs_restore')
 
 #
 # Binary construction (R7A)
 #
 
-@opcode(87, 2)
-class BeamInstBsInit(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_init')
+BeamInstBsInit = simple_inst('BeamInstBsInit', 87, 2, '-bs_init')
+BeamInstBsFinal = simple_inst('BeamInstBsFinal', 88, 2, '-bs_final')
+BeamInstBsPutInteger = simple_inst('BeamInstBsPutInteger', 89, 5, 'bs_put_integer')
+BeamInstBsPutBinary = simple_inst('BeamInstBsPutBinary', 90, 5, 'bs_put_binary')
+BeamInstBsPutFloat = simple_inst('BeamInstBsPutFloat', 91, 5, 'bs_put_float')
 
-@opcode(88, 2)
-class BeamInstBsFinal(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_final')
-
-@opcode(89, 5)
-class BeamInstBsPutInteger(BeamInst):
-    def __init__(self):
-        super().__init__('bs_put_integer')
-
-@opcode(90, 5)
-class BeamInstBsPutBinary(BeamInst):
-    def __init__(self):
-        super().__init__('bs_put_binary')
-
-@opcode(91, 5)
-class BeamInstBsPutFloat(BeamInst):
-    def __init__(self):
-        super().__init__('bs_put_float')
-
-@opcode(92, 2)
+@opcode(92, 2, 'bs_put_string', fmt='{}, {}', specs=(OP_MODVAL, OP_MODVAL))
 class BeamInstBsPutString(BeamInst):
-    def __init__(self):
-        super().__init__('bs_put_string')
-
-    def to_string(self, module):
-        return self.format(module, '{}, {}', [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1])
-        ])
+    __slots__ = ()
 
 #
 # Binary construction (R7B)
 #
 
-@opcode(93, 1)
-class BeamInstBsNeedBuf(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_need_buf')
+BeamInstBsNeedBuf = simple_inst('BeamInstBsNeedBuf', 93, 1, '-bs_need_buf')
 
 #
 # Floating point arithmetic
 #
 
-@opcode(94, 0)
-class BeamInstFClearError(BeamInst):
-    def __init__(self):
-        super().__init__('fclearerror')
-
-@opcode(95, 1)
-class BeamInstFCheckError(BeamInst):
-    def __init__(self):
-        super().__init__('fcheckerror')
-
-@opcode(96, 2)
-class BeamInstFMove(BeamInst):
-    def __init__(self):
-        super().__init__('fmove')
-
-@opcode(97, 2)
-class BeamInstFConv(BeamInst):
-    def __init__(self):
-        super().__init__('fconv')
-
-@opcode(98, 4)
-class BeamInstFAdd(BeamInst):
-    def __init__(self):
-        super().__init__('fadd')
-
-@opcode(99, 4)
-class BeamInstFSub(BeamInst):
-    def __init__(self):
-        super().__init__('fsub')
-
-@opcode(100, 4)
-class BeamInstFMul(BeamInst):
-    def __init__(self):
-        super().__init__('fmul')
-
-@opcode(101, 4)
-class BeamInstFDiv(BeamInst):
-    def __init__(self):
-        super().__init__('fdiv')
-
-@opcode(102, 3)
-class BeamInstFNegate(BeamInst):
-    def __init__(self):
-        super().__init__('fnegate')
+BeamInstFClearError = simple_inst('BeamInstFClearError', 94, 0, 'fclearerror')
+BeamInstFCheckError = simple_inst('BeamInstFCheckError', 95, 1, 'fcheckerror')
+BeamInstFMove = simple_inst('BeamInstFMove', 96, 2, 'fmove')
+BeamInstFConv = simple_inst('BeamInstFConv', 97, 2, 'fconv')
+BeamInstFAdd = simple_inst('BeamInstFAdd', 98, 4, 'fadd')
+BeamInstFSub = simple_inst('BeamInstFSub', 99, 4, 'fsub')
+BeamInstFMul = simple_inst('BeamInstFMul', 100, 4, 'fmul')
+BeamInstFDiv = simple_inst('BeamInstFDiv', 101, 4, 'fdiv')
+BeamInstFNegate = simple_inst('BeamInstFNegate', 102, 3, 'fnegate')
 
 
 #
 # New fun construction (R8)
 #
 
-@opcode(103, 1)
-class BeamInstMakeFun2(BeamInst):
-    def __init__(self):
-        super().__init__('make_fun2')
+BeamInstMakeFun2 = simple_inst('BeamInstMakeFun2', 103, 1, 'make_fun2')
 
 
 
@@ -1272,329 +796,124 @@ class BeamInstMakeFun2(BeamInst):
 # Try/catch/raise (R10B)
 #
 
-@opcode(104, 2)
+@opcode(104, 2, 'try', fmt='{}, label{:d}', specs=(OP_MODVAL, OP_INDEX))
 class BeamInstTry(BeamInst):
-    def __init__(self):
-        super().__init__('try')
-
-    def to_string(self, module):
-        return self.format(module, '{}, label{:d}', [
-            module.get_value(self.operands[0]),
-            self.operands[1].index
-        ])
-
-@opcode(105, 1)
-class BeamInstTryEnd(BeamInst):
-    def __init__(self):
-        super().__init__('try_end')
+    __slots__ = ()
 
-@opcode(106, 1)
-class BeamInstTryCase(BeamInst):
-    def __init__(self):
-        super().__init__('try_case')
-
-@opcode(107, 1)
-class BeamInstTryCaseEnd(BeamInst):
-    def __init__(self):
-        super().__init__('try_case_end')
-
-@opcode(108, 2)
-class BeamInstRaise(BeamInst):
-    def __init__(self):
-        super().__init__('raise')
+BeamInstTryEnd = simple_inst('BeamInstTryEnd', 105, 1, 'try_end')
+BeamInstTryCase = simple_inst('BeamInstTryCase', 106, 1, 'try_case')
+BeamInstTryCaseEnd = simple_inst('BeamInstTryCaseEnd', 107, 1, 'try_case_end')
+BeamInstRaise = simple_inst('BeamInstRaise', 108, 2, 'raise')
 
 #
 # New insts in R10B
 #
 
-@opcode(109, 6)
-class BeamInstBsInit2(BeamInst):
-    def __init__(self):
-        super().__init__('bs_init2')
-
-@opcode(110, 3)
-class BeamInstBsBitsToBytes(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_bits_to_bytes')
+BeamInstBsInit2 = simple_inst('BeamInstBsInit2', 109, 6, 'bs_init2')
+BeamInstBsBitsToBytes = simple_inst('BeamInstBsBitsToBytes', 110, 3, '-bs_bits_to_bytes')
 
-@opcode(111, 5)
+@opcode(111, 5, 'bs_add')
 class BeamInstBsAdd(BeamInst):
-    def __init__(self):
-        super().__init__('bs_add')
-    
-@opcode(112, 1)
-class BeamInstApply(BeamInst):
-    def __init__(self):
-        super().__init__('apply')
+    __slots__ = ()
 
-@opcode(113, 2)
-class BeamInstApplyLast(BeamInst):
-    def __init__(self):
-        super().__init__('apply_last')
+    
+BeamInstApply = simple_inst('BeamInstApply', 112, 1, 'apply')
+BeamInstApplyLast = simple_inst('BeamInstApplyLast', 113, 2, 'apply_last')
 
-@opcode(114, 2)
+@opcode(114, 2, 'is_boolean')
 @branch
 @jumpref_op(0)
 class BeamInstIsBoolean(BeamInst):
-    def __init__(self):
-        super().__init__('is_boolean')
+    __slots__ = ()
 
-@opcode(115, 3)
-class BeamInstIsFunction2(BeamInst):
-    def __init__(self):
-        super().__init__('is_function2')
+BeamInstIsFunction2 = simple_inst('BeamInstIsFunction2', 115, 3, 'is_function2')
 
 #
 # New bit syntax matching in R11B
 #
 
-@opcode(116, 5)
-class BeamInstBsStartMatch2(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_start_match2')
-
-@opcode(117, 7)
-class BeamInstBsGetInteger2(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_integer2')
+BeamInstBsStartMatch2 = simple_inst('BeamInstBsStartMatch2', 116, 5, '-bs_start_match2')
+BeamInstBsGetInteger2 = simple_inst('BeamInstBsGetInteger2', 117, 7, 'bs_get_integer2')
+BeamInstBsGetFloat2 = simple_inst('BeamInstBsGetFloat2', 118, 7, 'bs_get_float2')
+BeamInstBsGetBinary2 = simple_inst('BeamInstBsGetBinary2', 119, 7, 'bs_get_binary2')
 
-@opcode(118, 7)
-class BeamInstBsGetFloat2(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_float2')
 
-@opcode(119, 7)
-class BeamInstBsGetBinary2(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_binary2')
-
-
-@opcode(120, 5)
-class BeamInstBsSkipBits2(BeamInst):
-    def __init__(self):
-        super().__init__('bs_skip_bits2')
-
-@opcode(121, 3)
-class BeamInstBsTestTail2(BeamInst):
-    def __init__(self):
-        super().__init__('bs_test_tail2')
-
-@opcode(122, 2)
-class BeamInstBsSave2(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_save2')
-
-@opcode(123, 2)
-class BeamInstBsRestore2(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_restore2')
+BeamInstBsSkipBits2 = simple_inst('BeamInstBsSkipBits2', 120, 5, 'bs_skip_bits2')
+BeamInstBsTestTail2 = simple_inst('BeamInstBsTestTail2', 121, 3, 'bs_test_tail2')
+BeamInstBsSave2 = simple_inst('BeamInstBsSave2', 122, 2, '-bs_save2')
+BeamInstBsRestore2 = simple_inst('BeamInstBsRestore2', 123, 2, '-bs_restore2')
 
 
 #
 # New GC bifs introduced in R11B
 #
 
-@opcode(124, 5)
+@opcode(124, 5, 'gc_bif1', fmt='label{:d}, {}, {}, {}, {}',
+        specs=(OP_INDEX, OP_INDEX, OP_INDEX, OP_MODVAL, OP_MODVAL))
 class BeamInstGCBif1(BeamInst):
-    def __init__(self):
-        super().__init__('gc_bif1')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, 'label{:d}, {}, {}, {}, {}', [
-            self.operands[0].index,
-            self.operands[1].index,
-            self.operands[2].index,
-            module.get_value(self.operands[3]),
-            module.get_value(self.operands[4]),
-        ])
-
-@opcode(125, 6)
+@opcode(125, 6, 'gc_bif2', fmt='label{:d}, {:d}, {}, {}, {}, {}',
+        specs=(OP_INDEX, OP_INDEX, OP_IMPORT, OP_MODVAL, OP_MODVAL, OP_MODVAL))
 class BeamInstGCBif2(BeamInst):
-    def __init__(self):
-        super().__init__('gc_bif2')
-
-    def to_string(self, module):
-        '''Operands:
-        - Label
-        - Integer
-        - Literal
-        - reg
-        - Integer
-        - reg
-        '''
-        return self.format(module, 'label{:d}, {:d}, {}, {}, {}, {}', [
-            self.operands[0].index,
-            self.operands[1].index,
-            module.get_import_str(self.operands[2].index),
-            module.get_value(self.operands[3]),
-            module.get_value(self.operands[4]),
-            module.get_value(self.operands[5])
-        ])
+    __slots__ = ()
 
-@opcode(126, 2)
-class BeamInstBsFinal2(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_final2')
+BeamInstBsFinal2 = simple_inst('BeamInstBsFinal2', 126, 2, '-bs_final2')
+BeamInstBsBitsToBytes2 = simple_inst('BeamInstBsBitsToBytes2', 127, 2, '-bs_bits_to_bytes2')
+BeamInstPutLiteral = simple_inst('BeamInstPutLiteral', 128, 2, '-put_literal')
 
-@opcode(127, 2)
-class BeamInstBsBitsToBytes2(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_bits_to_bytes2')
-
-@opcode(128, 2)
-class BeamInstPutLiteral(BeamInst):
-    def __init__(self):
-        super().__init__('-put_literal')
-
-@opcode(129, 2)
+@opcode(129, 2, 'is_bitstr')
 @branch
 @jumpref_op(0)
 class BeamInstIsBitStr(BeamInst):
-    def __init__(self):
-        super().__init__('is_bitstr')
+    __slots__ = ()
 
 #
 # R12B
 #
 
-@opcode(130, 1)
-class BeamInstBsContextToBinary(BeamInst):
-    def __init__(self):
-        super().__init__('-bs_context_to_binary')
-
-@opcode(131, 3)
-class BeamInstBsTestUnit(BeamInst):
-    def __init__(self):
-        super().__init__('bs_test_unit')
+BeamInstBsContextToBinary = simple_inst('BeamInstBsContextToBinary', 130, 1, '-bs_context_to_binary')
+BeamInstBsTestUnit = simple_inst('BeamInstBsTestUnit', 131, 3, 'bs_test_unit')
 
-@opcode(132, 4)
+@opcode(132, 4, 'bs_match_string', fmt='label{:d}, {}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL, OP_MODVAL))
 class BeamInstBsMatchString(BeamInst):
-    def __init__(self):
-        super().__init__('bs_match_string')
-
-    def to_string(self, module):
-        return self.format(module, 'label{:d}, {}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2]),
-            module.get_value(self.operands[3])
-        ])
+    __slots__ = ()
 
 
-@opcode(133, 0)
-class BeamInstBsInitWritable(BeamInst):
-    def __init__(self):
-        super().__init__('bs_init_writable')
+BeamInstBsInitWritable = simple_inst('BeamInstBsInitWritable', 133, 0, 'bs_init_writable')
+BeamInstBsAppend = simple_inst('BeamInstBsAppend', 134, 8, 'bs_append')
+BeamInstBsPrivateAppend = simple_inst('BeamInstBsPrivateAppend', 135, 6, 'bs_private_append')
 
-@opcode(134, 8)
-class BeamInstBsAppend(BeamInst):
-    def __init__(self):
-        super().__init__('bs_append')
-
-@opcode(135, 6)
-class BeamInstBsPrivateAppend(BeamInst):
-    def __init__(self):
-        super().__init__('bs_private_append')
-
-@opcode(136, 2)
+@opcode(136, 2, 'trim', fmt='{:d}, {:d}', specs=(OP_INDEX, OP_INDEX))
 class BeamInstTrim(BeamInst):
-    def __init__(self):
-        super().__init__('trim')
-
-    def to_string(self, module):
-        return self.format(module, '{:d}, {:d}', [
-            self.operands[0].index,
-            self.operands[1].index
-        ])
-
-@opcode(137, 6)
-class BeamInstBsInitBits(BeamInst):
-    def __init__(self):
-        super().__init__('bs_init_bits')
-
-@opcode(138, 5)
-class BeamInstBsGetUtf8(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_utf8')
-
-@opcode(139, 4)
-class BeamInstBsSkipUtf8(BeamInst):
-    def __init__(self):
-        super().__init__('bs_skip_utf8')
-
-@opcode(140, 5)
-class BeamInstBsGetUtf16(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_utf16')
-
-@opcode(141, 4)
-class BeamInstBsSkipUtf16(BeamInst):
-    def __init__(self):
-        super().__init__('bs_skip_utf16')
-
-@opcode(142, 5)
-class BeamInstBsGetUtf32(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_utf32')
-
-@opcode(143, 4)
-class BeamInstBsSkipUtf32(BeamInst):
-    def __init__(self):
-        super().__init__('bs_skip_utf32')
-
-@opcode(144, 3)
-class BeamInstBsUtf8Size(BeamInst):
-    def __init__(self):
-        super().__init__('bs_utf8_size')
-
-@opcode(145, 3)
-class BeamInstBsPutUtf8(BeamInst):
-    def __init__(self):
-        super().__init__('bs_put_utf8')
-
-@opcode(146, 3)
-class BeamInstBsUtf16Size(BeamInst):
-    def __init__(self):
-        super().__init__('bs_utf16_size')
-
-@opcode(147, 3)
-class BeamInstBsPutUtf16(BeamInst):
-    def __init__(self):
-        super().__init__('bs_put_utf16')
-
-@opcode(148, 3)
-class BeamInstBsPutUtf32(BeamInst):
-    def __init__(self):
-        super().__init__('bs_put_utf32')
-
-@opcode(149, 0)
-class BeamInstOnLoad(BeamInst):
-    def __init__(self):
-        super().__init__('on_load')
+    __slots__ = ()
+
+BeamInstBsInitBits = simple_inst('BeamInstBsInitBits', 137, 6, 'bs_init_bits')
+BeamInstBsGetUtf8 = simple_inst('BeamInstBsGetUtf8', 138, 5, 'bs_get_utf8')
+BeamInstBsSkipUtf8 = simple_inst('BeamInstBsSkipUtf8', 139, 4, 'bs_skip_utf8')
+BeamInstBsGetUtf16 = simple_inst('BeamInstBsGetUtf16', 140, 5, 'bs_get_utf16')
+BeamInstBsSkipUtf16 = simple_inst('BeamInstBsSkipUtf16', 141, 4, 'bs_skip_utf16')
+BeamInstBsGetUtf32 = simple_inst('BeamInstBsGetUtf32', 142, 5, 'bs_get_utf32')
+BeamInstBsSkipUtf32 = simple_inst('BeamInstBsSkipUtf32', 143, 4, 'bs_skip_utf32')
+BeamInstBsUtf8Size = simple_inst('BeamInstBsUtf8Size', 144, 3, 'bs_utf8_size')
+BeamInstBsPutUtf8 = simple_inst('BeamInstBsPutUtf8', 145, 3, 'bs_put_utf8')
+BeamInstBsUtf16Size = simple_inst('BeamInstBsUtf16Size', 146, 3, 'bs_utf16_size')
+BeamInstBsPutUtf16 = simple_inst('BeamInstBsPutUtf16', 147, 3, 'bs_put_utf16')
+BeamInstBsPutUtf32 = simple_inst('BeamInstBsPutUtf32', 148, 3, 'bs_put_utf32')
+BeamInstOnLoad = simple_inst('BeamInstOnLoad', 149, 0, 'on_load')
 
 #
 # R14A
 #
 
-@opcode(150, 1)
-class BeamInstRecvMark(BeamInst):
-    def __init__(self):
-        super().__init__('recv_mark')
+BeamInstRecvMark = simple_inst('BeamInstRecvMark', 150, 1, 'recv_mark')
+BeamInstRecvSet = simple_inst('BeamInstRecvSet', 151, 1, 'recv_set')
+BeamInstGcBif3 = simple_inst('BeamInstGcBif3', 152, 7, 'gc_bif3')
 
-@opcode(151, 1)
-class BeamInstRecvSet(BeamInst):
-    def __init__(self):
-        super().__init__('recv_set')
-
-@opcode(152, 7)
-class BeamInstGcBif3(BeamInst):
-    def __init__(self):
-        super().__init__('gc_bif3')
-
-@opcode(153, 1)
+@opcode(153, 1, 'line')
 class BeamInstLine(BeamInst):
-    def __init__(self):
-        super().__init__('line')
+    __slots__ = ()
 
     def __repr__(self):
         return 'Line(%s)' % self.operands[0]
@@ -1602,280 +921,136 @@ class BeamInstLine(BeamInst):
     def to_string(self, module):
         '''Line is followed by a literal representing a line number index.
         '''
-        result = module.get_lineno(self.operands[0].index)
-        if result is not None:
-            filename, line_no = result
-            if filename is None:
-                return '\t; line %d' % line_no
-            else:
-                return '\t; file %s line %d' % (filename, line_no)
-        else:
-            return ''
+        return module.get_lineno_str(self.operands[0].index)
 
 #
 # R17
 #
 
-@opcode(154, 5)
-class BeamInstPutMapAssoc(BeamInst):
-    def __init__(self):
-        super().__init__('put_map_assoc')
-
-@opcode(155, 5)
-class BeamInstPutMapExact(BeamInst):
-    def __init__(self):
-        super().__init__('put_map_exact')
+BeamInstPutMapAssoc = simple_inst('BeamInstPutMapAssoc', 154, 5, 'put_map_assoc')
+BeamInstPutMapExact = simple_inst('BeamInstPutMapExact', 155, 5, 'put_map_exact')
 
-@opcode(156, 2)
+@opcode(156, 2, 'is_map', fmt='label{:d}, {}', specs=(OP_INDEX, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsMap(BeamInst):
-    def __init__(self):
-        super().__init__('is_map')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, 'label{:d}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1])
-        ])
-
-@opcode(157, 3)
-class BeamInstHasMapFields(BeamInst):
-    def __init__(self):
-        super().__init__('has_map_fields')
-
-@opcode(158, 3)
-class BeamInstGetMapElements(BeamInst):
-    def __init__(self):
-        super().__init__('get_map_elements')
+BeamInstHasMapFields = simple_inst('BeamInstHasMapFields', 157, 3, 'has_map_fields')
+BeamInstGetMapElements = simple_inst('BeamInstGetMapElements', 158, 3, 'get_map_elements')
 
 #
 # R20
 #
 
-@opcode(159, 4)
+@opcode(159, 4, 'is_tagged_tuple', fmt='label{:d}, {}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_INDEX, OP_MODVAL))
 @branch
 @jumpref_op(0)
 class BeamInstIsTaggedTuple(BeamInst):
-    def __init__(self):
-        super().__init__('is_tagged_tuple')
-
-    def to_string(self, module):
-        return self.format(module, 'label{:d}, {}, {}, {}', [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            self.operands[2].index,
-            module.get_value(self.operands[3])
-        ])
+    __slots__ = ()
 
-@opcode(160, 0)
-class BeamInstBuildStacktrace(BeamInst):
-    def __init__(self):
-        super().__init__('build_stacktrace')
+BeamInstBuildStacktrace = simple_inst('BeamInstBuildStacktrace', 160, 0, 'build_stacktrace')
+BeamInstRawRaise = simple_inst('BeamInstRawRaise', 161, 0, 'raw_raise')
+BeamInstGetHd = simple_inst('BeamInstGetHd', 162, 2, 'get_hd')
+BeamInstGetTl = simple_inst('BeamInstGetTl', 163, 2, 'get_tl')
 
-@opcode(161, 0)
-class BeamInstRawRaise(BeamInst):
-    def __init__(self):
-        super().__init__('raw_raise')
-
-@opcode(162, 2)
-class BeamInstGetHd(BeamInst):
-    def __init__(self):
-        super().__init__('get_hd')
-
-@opcode(163, 2)
-class BeamInstGetTl(BeamInst):
-    def __init__(self):
-        super().__init__('get_tl')
-
-@opcode(164, 2)
+@opcode(164, 2, 'put_tuple2', fmt='{}, {}', specs=(OP_MODVAL, OP_MODVAL))
 class BeamInstPutTuple2(BeamInst):
-    def __init__(self):
-        super().__init__('put_tuple2')
-
-    def to_string(self, module):
-        return self.format(module, "{}, {}", [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1])
-        ])
+    __slots__ = ()
 
-@opcode(165, 3)
+@opcode(165, 3, 'bs_get_tail', fmt='{}, {}, {}',
+        specs=(OP_MODVAL, OP_MODVAL, OP_INDEX))
 class BeamInstBsGetTail(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_tail')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, "{}, {}, {}", [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1]),
-            self.operands[2].index
-        ])
-
-@opcode(166, 4)
+@opcode(166, 4, 'bs_start_match3', fmt='{}, {}, {}, {}',
+        specs=(OP_MODVAL, OP_MODVAL, OP_MODVAL, OP_MODVAL))
 class BeamInstBsStartMatch3(BeamInst):
-    def __init__(self):
-        super().__init__('bs_start_match3')
-
-    def to_string(self, module):
-        return self.format(module, "{}, {}, {}, {}", [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2]),
-            module.get_value(self.operands[3]),
-        ])
+    __slots__ = ()
 
-@opcode(167, 3)
+@opcode(167, 3, 'bs_get_position', fmt='{}, {}, {}',
+        specs=(OP_MODVAL, OP_MODVAL, OP_INDEX))
 class BeamInstBsGetPosition(BeamInst):
-    def __init__(self):
-        super().__init__('bs_get_position')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, "{}, {}, {}", [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1]),
-            self.operands[2].index
-        ])
-
-@opcode(168, 2)
-class BeamInstBsSetPosition(BeamInst):
-    def __init__(self):
-        super().__init__('bs_set_position')
+BeamInstBsSetPosition = simple_inst('BeamInstBsSetPosition', 168, 2, 'bs_set_position')
+BeamInstSwap = simple_inst('BeamInstSwap', 169, 2, 'swap')
 
-@opcode(169, 2)
-class BeamInstSwap(BeamInst):
-    def __init__(self):
-        super().__init__('swap')
-
-@opcode(170, 4)
+@opcode(170, 4, 'bs_start_match4')
 class BeamInstBsStartMatch4(BeamInst):
-    def __init__(self):
-        super().__init__('bs_start_match4')
+    __slots__ = ()
 
     def to_string(self, module):
-        return self.format(module, "{}, {}, {}, {}", [
-            module.get_value(self.operands[0]),
-            self.operands[0].index,
-            self.operands[2].index,
-            module.get_value(self.operands[3]),
-        ])
+        return '%s\t%-20s%s, %s, %s, %s' % (
+            '\n'.join(self._annotations), self.mnemonic,
+            module.get_value(self.operands[0]), self.operands[0].index,
+            self.operands[2].index, module.get_value(self.operands[3])
+        )
 
 #
 # OTP24
 #
 
-@opcode(171, 3)
+@opcode(171, 3, 'make_fun3', fmt='{}, {}, {}',
+        specs=(OP_INDEX, OP_MODVAL, OP_MODVAL))
 class BeamInstMakeFun3(BeamInst):
-    def __init__(self):
-        super().__init__('make_fun3')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, "{}, {}, {}", [
-            self.operands[0].index,
-            module.get_value(self.operands[1]),
-            module.get_value(self.operands[2]),
-        ])
-
-@opcode(172, 1)
+@opcode(172, 1, 'init_yregs', fmt='{}', specs=(OP_MODVAL,))
 class BeamInstInitYRegs(BeamInst):
     """init_yregs accept a list with the various Y registers to be initialized.
     """
 
-    def __init__(self):
-        super().__init__('init_yregs')
-
-    def to_string(self, module):
-        return self.format(module, '{}', [
-            module.get_value(self.operands[0])
-        ])
-
-@opcode(173, 2)
-class BeamInstRecvMarkerBind(BeamInst):
-    def __init__(self):
-        super().__init__('recv_marker_bind')
-
-@opcode(174, 1)
-class BeamInstRecvMarkerClear(BeamInst):
-    def __init__(self):
-        super().__init__('recv_marker_clear')
-
-@opcode(175, 1)
-class BeamInstRecvMarkerReserve(BeamInst):
-    def __init__(self):
-        super().__init__('recv_marker_reserve')
+    __slots__ = ()
 
-@opcode(176, 1)
-class BeamInstRecvMarkerUse(BeamInst):
-    def __init__(self):
-        super().__init__('recv_marker_user')
+BeamInstRecvMarkerBind = simple_inst('BeamInstRecvMarkerBind', 173, 2, 'recv_marker_bind')
+BeamInstRecvMarkerClear = simple_inst('BeamInstRecvMarkerClear', 174, 1, 'recv_marker_clear')
+BeamInstRecvMarkerReserve = simple_inst('BeamInstRecvMarkerReserve', 175, 1, 'recv_marker_reserve')
+BeamInstRecvMarkerUse = simple_inst('BeamInstRecvMarkerUse', 176, 1, 'recv_marker_user')
 
 #
 # OTP25
 #
 
-@opcode(177, 6)
+@opcode(177, 6, 'bs_create_bin', fmt='{}, {}, {}, {}, {}. {}',
+        specs=(OP_MODVAL, OP_MODVAL, OP_INDEX, OP_INDEX, OP_MODVAL, OP_MODVAL))
 class BeamInstBsCreateBin(BeamInst):
-    def __init__(self):
-        super().__init__('bs_create_bin')
-
-    def to_string(self, module):
-        return self.format(module, '{}, {}, {}, {}, {}. {}', [
-            module.get_value(self.operands[0]),
-            module.get_value(self.operands[1]),
-            self.operands[2].index,
-            self.operands[3].index,
-            module.get_value(self.operands[4]),
-            module.get_value(self.operands[5])
-        ])
+    __slots__ = ()
 
-@opcode(178, 3)
+@opcode(178, 3, 'call_fun2', fmt='{}, {}, {}',
+        specs=(OP_MODVAL, OP_INDEX, OP_MODVAL))
 class BeamInstCallFun2(BeamInst):
-    def __init__(self):
-        super().__init__('call_fun2')
+    __slots__ = ()
 
-    def to_string(self, module):
-        return self.format(module, '{}, {}, {}', [
-            module.get_value(self.operands[0]),
-            self.operands[1].index,
-            module.get_value(self.operands[2])
-        ])
-
-@opcode(179, 0)
-class BeamInstNifStart(BeamInst):
-    def __init__(self):
-        super().__init__('nif_start')
-
-@opcode(180, 1)
-class BeamInstBadRecord(BeamInst):
-    def __init__(self):
-        super().__init__('badrecord')
+BeamInstNifStart = simple_inst('BeamInstNifStart', 179, 0, 'nif_start')
+BeamInstBadRecord = simple_inst('BeamInstBadRecord', 180, 1, 'badrecord')
 
 #
 # OTP26
 #
 
-@opcode(181, 5)
+@opcode(181, 5, 'update_record')
 class BeamInstUpdateRecord(BeamInst):
-    def __init__(self):
-        super().__init__('update_record')
+    __slots__ = ()
 
     def to_string(self, module):
-        cases = []
-        for i in range(int(len(self.operands[4])/2)):
-            cases.append((self.operands[4][i*2], self.operands[4][i*2+1]))
-        switches = ', '.join(['%d => %s' % (k.index, module.get_value(v)) for k,v in cases])
-
-        return self.format(module, '{}, {}, {}, {}, [{}]', [
-            module.get_value(self.operands[0]),
-            self.operands[1].index,
-            module.get_value(self.operands[2]),
-            module.get_value(self.operands[3]),
-            switches
+        get_value = module.get_value
+        items = iter(self.operands[4])
+        switches = ', '.join([
+            '%d => %s' % (k.index, get_value(v)) for k, v in zip(items, items)
         ])
 
-@opcode(182, 3)
-class BeamInstBsMatch(BeamInst):
-    def __init__(self):
-        super().__init__('bs_match')
+        return '%s\t%-20s%s, %s, %s, %s, [%s]' % (
+            '\n'.join(self._annotations), self.mnemonic,
+            get_value(self.operands[0]), self.operands[1].index,
+            get_value(self.operands[2]), get_value(self.operands[3]),
+            switches
+        )
+
+BeamInstBsMatch = simple_inst('BeamInstBsMatch', 182, 3, 'bs_match')
+
+BeamInstsRegistry.freeze()
 
 
 class BeamInstParser(object):
@@ -1887,13 +1062,11 @@ class BeamInstParser(object):
         '''Parse a single instruction and return the corresponding object
         holding its representation.
         '''
-        # Parse opcode
-        inst_opcode = unpack('>B', content.read(1))[0]
-
-        try:
-            # Parse instruction operands
-            return BeamInstsRegistry.inst_class(inst_opcode).parse_operands(content)
-        except IndexError as op_not_found:
-            traceback.print_exc()
-            print(op_not_found)
-            return None
+        # Parse opcode
+        inst_opcode = content.read(1)[0]
+
+        # Parse instruction operands
+        inst = BeamInstsRegistry.decode(inst_opcode, content)
+        if inst is None:
+            print('[!] Unknown opcode %d' % inst_opcode)
+        return inst
@@ -5,9 +5,9 @@ import os
 import zipfile
 import traceback
 
-from io import BytesIO
-from struct import unpack
-from tempfile import NamedTemporaryFile
+from io import BytesIO, StringIO
+from pathlib import Path
+from struct import Struct
 
 
 from .exceptions import InvalidBeamHeader, UnknownBeamFileFormat
@@ -17,30 +17,115 @@ from .types import BeamLiteral, BeamLabel, BeamNIL, BeamAtom, BeamInteger, \
     BeamXReg, BeamYReg, BeamTypedReg, BeamExtList
 from .ext import BeamListExt
 
+# Precompiled formats used by the chunk parser
+U32 = Struct('>I')
+IFF_HEADER = Struct('>III')
+
+# Register names are formatted over and over, precompute the usual ones
+X_REGISTERS = tuple('X%d' % index for index in range(1024))
+Y_REGISTERS = tuple('Y%d' % index for index in range(1024))
+
 class BeamFile:
     '''BEAM file format parser
     '''
 
-    def __init__(self, f):
+    __slots__ = (
+        '__data', '__length', '__chunks', '__sections', '__atom_strs',
+        '__import_strs', '__atom_pool'
+    )
+
+    # Section parsers, indexed by chunk marker
+    SECTION_PARSERS = {
+        b'Line': BeamLineSection.parse,
+        b'AtU8': BeamAtomSection.parse,
+        b'ImpT': BeamImportSection.parse,
+        b'ExpT': BeamExportSection.parse,
+        b'FunT': BeamFunctionSection.parse,
+        b'LitT': BeamLiteralSection.parse,
+        b'Code': BeamCodeSection.parse,
+    }
+
+    # Keys under which chunks are recorded, indexed by chunk marker (old
+    # style atom tables are stored along with UTF-8 ones)
+    CHUNK_KEYS = {
+        b'Line': b'Line',
+        b'Atom': b'AtU8',
+        b'AtU8': b'AtU8',
+        b'ImpT': b'ImpT',
+        b'ExpT': b'ExpT',
+        b'FunT': b'FunT',
+        b'LitT': b'LitT',
+        b'Code': b'Code',
+    }
+
+    def __init__(self, f, atom_pool=None):
         '''Initialize a BeamFile object.
 
-        @param  f   python file object
+        @param  f           python file object
+        @param  atom_pool   dict of atoms shared with other modules (optional)
         '''
-        # Save source
-        self.__source = f
-
-        # Initialize sections
+        # Initialize sections: chunks are kept raw and only parsed when
+        # first needed
+        self.__data = b''
         self.__length = 0
-        self.__atoms = None
-        self.__code = None
-        self.__funcs = None
-        self.__exports = None
-        self.__literals = None
-        self.__imports = None
-        self.__line_nums = None
+        self.__chunks = {}
+        self.__sections = {}
+        self.__atom_strs = {}
+        self.__import_strs = {}
+        self.__atom_pool = atom_pool
+
+        # Parse beam file, the source is not kept afterwards
+        self.__parse(f)
+
+    def __section(self, marker):
+        '''Retrieve a section, parsing its chunk on first access.
+
+        Return None if the BEAM file has no such chunk.
+        '''
+        try:
+            return self.__sections[marker]
+        except KeyError:
+            bounds = self.__chunks.get(marker)
+            if bounds is None:
+                section = None
+            else:
+                # Sections are parsed in place from the file content
+                offset, end = bounds
+                parse = BeamFile.SECTION_PARSERS[marker]
+                if marker == b'AtU8':
+                    section = parse(self.__data, offset, end, self.__atom_pool)
+                else:
+                    section = parse(self.__data, offset, end)
+            self.__sections[marker] = section
+            return section
+
+    @property
+    def __atoms(self):
+        return self.__section(b'AtU8')
+
+    @property
+    def __code(self):
+        return self.__section(b'Code')
+
+    @property
+    def __funcs(self):
+        return self.__section(b'FunT')
+
+    @property
+    def __exports(self):
+        return self.__section(b'ExpT')
+
+    @property
+    def __literals(self):
+        return self.__section(b'LitT')
+
+    @property
+    def __imports(self):
+        return self.__section(b'ImpT')
 
-        # Parse beam file
-        self.__parse()
+    @property
+    def __line_nums(self):
+        return self.__section(b'Line')
 
     @property
     def code(self):
@@ -60,80 +145,69 @@ class BeamFile:
         """
         return lit.replace('\n', '\\n').replace('\r', '\\r')
 
-    def __parse(self):
+    def __parse(self, f):
         try:
-            # Check header and read file length
-            self.__check_header()
-
-            # Iterate over chunks
-            read_length = 0
-            while read_length < (self.__length - 4):
-                # Read 4-byte marker
-                marker = self.__source.read(4)
+            # Load the whole file at once, this is the only copy of its
+            # content: chunks are then recorded as bounds in this buffer
+            data = f.read()
+            self.__data = data
 
-                # Read chunk length
-                chunk_length = unpack('>I', self.__source.read(4))[0]
+            # Check header and read file length
+            self.__check_header(data)
 
-                # Read chunk body
-                chunk_body = self.__source.read(chunk_length)
+            # Iterate over chunks (file length does not include the 8-byte
+            # IFF header)
+            offset = 12
+            end = self.__length + 8
+            while offset < end:
+                # Read 4-byte marker
+                marker = data[offset:offset + 4]
 
-                # Process chunk
-                self.__decode_chunk(marker, chunk_body)
+                # Read chunk length
+                chunk_length = U32.unpack_from(data, offset + 4)[0]
 
-                # Align on 4-byte boundary
-                next_chunk_offset = 4*(int((chunk_length + 3) / 4))
-                remaining = next_chunk_offset - chunk_length
-                _next_chunk_offset = next_chunk_offset + read_length + 12 + 8
-                _ = self.__source.read(remaining)
+                # Process chunk body
+                offset += 8
+                self.__decode_chunk(marker, offset, offset + chunk_length)
 
-                read_length += 8 + next_chunk_offset          
+                # Align on 4-byte boundary
+                offset += (chunk_length + 3) & ~3
 
         except IOError as input_error:
             raise UnknownBeamFileFormat from input_error
         except InvalidBeamHeader as invalid_header:
             raise UnknownBeamFileFormat from invalid_header
 
-    def __check_header(self):
+    def __check_header(self, data):
         '''Check BEAM file header
 
         Raises InvalidBeamHeader if header is not valid.
         '''
         try:
-            # Read file header
-            header = self.__source.read(12)
-            if len(header) != 12:
+            # Check file header
+            if len(data) < 12:
                 print('not enough bytes')
                 raise InvalidBeamHeader
 
             # Validate file header
-            iff, length, magic = unpack('>III', header)
+            iff, length, magic = IFF_HEADER.unpack_from(data)
             assert iff == 0x464f5231
             assert magic == 0x4245414d
 
-            # Save length
+            # Save length
             self.__length = length
-        except IOError as read_error:
-            raise InvalidBeamHeader from read_error
         except AssertionError as fail:
             raise InvalidBeamHeader from fail
 
-    def __decode_chunk(self, marker, content):
-        '''Decode chunk based on chunk marker and content
+    def __decode_chunk(self, marker, offset, end):
+        '''Decode chunk based on chunk marker and bounds.
+
+        Chunks are only recorded here, see `__section()`. Unknown chunks
+        are ignored.
         '''
-        if marker == b'Line':
-            self.__line_nums = BeamLineSection.parse(BytesIO(content))
-        elif marker ==  b'Atom' or marker == b'AtU8':
-            self.__atoms = BeamAtomSection.parse(BytesIO(content))
-        elif marker == b'ImpT':
-            self.__imports = BeamImportSection.parse(BytesIO(content))
-        elif marker == b'ExpT':
-            self.__exports = BeamExportSection.parse(BytesIO(content))
-        elif marker == b'FunT':
-            self.__funcs = BeamFunctionSection.parse(BytesIO(content))
-        elif marker == b'LitT':
-            self.__literals = BeamLiteralSection.parse(BytesIO(content))
-        elif marker == b'Code':
-            self.__code = BeamCodeSection.parse(BytesIO(content))
+        key = BeamFile.CHUNK_KEYS.get(marker)
+        if key is not None:
+            self.__chunks[key] = (offset, end)
 
     def get_atom(self, atom_index):
         '''Get atom by index
@@ -141,7 +215,13 @@ class BeamFile:
         if isinstance(atom_index, BeamNIL):
             return 'nil'
         elif self.__atoms is not None:
-            return self.__atoms[atom_index].decode('utf-8')
+            # Atoms are decoded once, on first use
+            try:
+                return self.__atom_strs[atom_index]
+            except KeyError:
+                atom = self.__atoms[atom_index].decode('utf-8')
+                self.__atom_strs[atom_index] = atom
+                return atom
 
     def get_literal(self, literal_index):
         '''Get literal by index
@@ -155,31 +235,72 @@ class BeamFile:
         if self.__line_nums is not None:
             return self.__line_nums.get(line_index)
 
+    def get_lineno_str(self, line_index):
+        '''Get line reference from Line table, formatted as a comment
+        '''
+        if self.__line_nums is not None:
+            return self.__line_nums.get_str(line_index)
+        return ''
+
+    def __format_atom(self, value):
+        return "'%s'" % self.get_atom(value.index)
+
+    def __format_integer(self, value):
+        return '0x%x' % value.value
+
+    def __format_label(self, value):
+        return 'label%d' % value.index
+
+    def __format_literal(self, value):
+        literal = self.get_literal(value.index)
+        if literal is not None:
+            return '`%s`' % literal
+        else:
+            return '%d' % value.index
+
+    def __format_yreg(self, value):
+        if value.index < len(Y_REGISTERS):
+            return Y_REGISTERS[value.index]
+        return 'Y%d' % value.index
+
+    def __format_xreg(self, value):
+        if value.index < len(X_REGISTERS):
+            return X_REGISTERS[value.index]
+        return 'X%d'  % value.index
+
+    def __format_typed_reg(self, value):
+        return '{}<{}>'.format(value.register, value.typeinfo.index)
+
+    def __format_list(self, value):
+        contents = ', '.join([self.get_value(i) for i in value])
+        return '[%s]' % contents
+
+    # Value formatters used by `get_value()`, indexed by value type
+    VALUE_FORMATTERS = {
+        BeamAtom: __format_atom,
+        BeamInteger: __format_integer,
+        BeamLabel: __format_label,
+        BeamLiteral: __format_literal,
+        BeamYReg: __format_yreg,
+        BeamXReg: __format_xreg,
+        BeamTypedReg: __format_typed_reg,
+        BeamListExt: __format_list,
+        BeamExtList: __format_list,
+    }
+
     def get_value(self, value):
-        if isinstance(value, BeamAtom):
-            return "'%s'" % self.get_atom(value.index)
-        elif isinstance(value, BeamInteger):
-            return '0x%x' % value.value
-        elif isinstance(value, BeamLabel):
-            return 'label%d' % value.index
-        elif isinstance(value, BeamLiteral):
-            literal = self.get_literal(value.index)
-            if literal is not None:
-                return '`%s`' % literal
+        '''Format a value (atom, integer, register, ...) as a string
+        '''
+        formatter = BeamFile.VALUE_FORMATTERS.get(value.__class__)
+        if formatter is None:
+            # Subclasses are resolved through their parent classes
+            for clazz in value.__class__.__mro__[1:]:
+                formatter = BeamFile.VALUE_FORMATTERS.get(clazz)
+                if formatter is not None:
+                    break
             else:
-                return '%d' % value.index
-        elif isinstance(value, BeamYReg):
-            return 'Y%d' % value.index
-        elif isinstance(value, BeamXReg):
-            return 'X%d'  % value.index
-        elif isinstance(value, BeamTypedReg):
-            return '{}<{}>'.format(value.register, value.typeinfo.index)
-        elif isinstance(value, BeamListExt):
-            contents = ', '.join([self.get_value(i) for i in value])
-            return '[%s]' % contents
-        elif isinstance(value, BeamExtList):
-            contents = ', '.join([self.get_value(i) for i in value])
-            return '[%s]' % contents
+                return None
+        return formatter(self, value)
 
     def imports(self):
         '''List imports
@@ -187,27 +308,28 @@ class BeamFile:
         Return a list of tuples (module, function, arity) for each import
         declared in the BEAM file.
         '''
-        imports = []
-        if self.__imports is not None:
-            for imp in self.__imports.imports:
-                module_name = self.get_atom(imp.module).decode('utf-8')
-                func_name = self.get_atom(imp.function).decode('utf-8')
-                imports.append((
-                    module_name,
-                    func_name,
-                    imp.arity
-                ))
-        return imports
+        if self.__imports is None:
+            return []
+        get_atom = self.get_atom
+        return [
+            (get_atom(imp.module), get_atom(imp.function), imp.arity)
+            for imp in self.__imports.imports
+        ]
 
     def get_import_str(self, import_index):
         '''Get import as string
         '''
-        imp = self.__imports.get(import_index)
-        return '<%s:%s/%d>' % (
-            self.get_atom(imp.module),
-            self.get_atom(imp.function),
-            imp.arity
-        )
+        try:
+            return self.__import_strs[import_index]
+        except KeyError:
+            imp = self.__imports.get(import_index)
+            import_str = '<%s:%s/%d>' % (
+                self.get_atom(imp.module),
+                self.get_atom(imp.function),
+                imp.arity
+            )
+            self.__import_strs[import_index] = import_str
+            return import_str
 
     def exports(self):
         '''List exports
@@ -215,15 +337,12 @@ class BeamFile:
         Return a list of tuples (module, function, arity) for each export
         declared in the BEAM file.
         '''
-        exports = []
-        if self.__exports is not None:
-            for exp in self.__exports.exports:
-                func_name = self.get_atom(exp.name).decode('utf-8')
-                exports.append((
-                    func_name,
-                    exp.arity
-                ))
-        return exports
+        if self.__exports is None:
+            return []
+        get_atom = self.get_atom
+        return [
+            (get_atom(exp.name), exp.arity) for exp in self.__exports.exports
+        ]
 
     def get_export_str(self, export_index):
         '''Get export as string
@@ -254,14 +373,23 @@ class BeamFile:
                 ))
         return functions
 
-    def generate_assembly(self):
+    def generate_assembly(self, out=None):
         '''Process code instructions, translate operands into readable values
         and display the result.
+
+        Instructions are written one by one to `out` (any object with a
+        `write()` method) if provided, otherwise the whole listing is
+        returned as a string.
         '''
-        output = ''
+        if out is None:
+            output = StringIO()
+            self.generate_assembly(output)
+            return output.getvalue()
+
+        write = out.write
         for inst in self.__code.insts:
-            output += '%s\n' % inst.to_string(self)
-        return output
+            write(inst.to_string(self))
+            write('\n')
 
 
 def load_gzipped_beam(filename):
@@ -274,24 +402,45 @@ def load_gzipped_beam(filename):
         traceback.print_exc()
         raise UnknownBeamFileFormat from oops
 
-def load_beam(filename):
+def load_beam_content(content, atom_pool=None):
+    '''Load BEAM file from its content (bytes), possibly gzipped.
+
+    Modules loaded with the same `atom_pool` (dict) share their atoms.
+    '''
+    # First try with normal BEAM file format
+    try:
+        return BeamFile(BytesIO(content), atom_pool)
+    except UnknownBeamFileFormat:
+        # Maybe a gzipped beam file, decompress it from memory
+        try:
+            return BeamFile(
+                gzip.GzipFile(fileobj=BytesIO(content)), atom_pool
+            )
+        except Exception as oops:
+            traceback.print_exc()
+            raise UnknownBeamFileFormat from oops
+
+def load_beam(filename, atom_pool=None):
     """Load BEAM file from filename.
     """
-    with open(filename,'rb') as f:
-        # First try with normal BEAM file format
-        try:
-            result = BeamFile(f)
-            return result
-        except UnknownBeamFileFormat:
-            # Maybe a gzipped beam file
-            result = load_gzipped_beam(filename)
-            return result
-
-def load_beams_from_ez(filename):
+    # BEAM files are small, read them at once
+    return load_beam_content(Path(filename).read_bytes(), atom_pool)
+
+def load_beams_from_ez(filename, atom_pool=None):
     '''Load a set of beams from EZ archive.
+
+    Modules of the archive share their atoms, through `atom_pool` (dict) if
+    provided.
     '''
     zfile = zipfile.ZipFile(filename)
     beams = []
+    if atom_pool is None:
+        atom_pool = {}
+
+    # Entries are loaded serially on purpose: loading a module only splits
+    # its chunks (sections are parsed lazily), and sending BeamFile objects
+    # back from worker processes would mean pickling their chunks, which
+    # costs about as much as loading them here.
 
     # Walk through zip file information list
     for info in zfile.infolist():
@@ -301,27 +450,14 @@ def load_beams_from_ez(filename):
             arch_fp = os.path.join(arch_path, arch_file)
             if arch_file.endswith('.beam'):
                 try:
-                    # try to load beam file as a normal BEAM file
-                    with zfile.open(arch_fp, 'r') as f:
-                        beams.append(BeamFile(f))
+                    # Read beam file from the archive only once, load it
+                    # as a normal or gzipped BEAM file
+                    beams.append(load_beam_content(
+                        zfile.read(arch_fp), atom_pool
+                    ))
                 except UnknownBeamFileFormat:
-                    try:
-                        # Consider beam file as gzipped
-                        with zfile.open(arch_fp, 'r') as f:
-                            # Extract compressed file into a temporary file
-                            content = f.read()
-                            temp = NamedTemporaryFile(delete=False)
-                            temp.write(content)
-                            temp.close()
-
-                            # Load beam from temporary file
-                            beams.append(load_beam(temp.name))
-
-                            # Delete temporary file
-                            os.unlink(temp.name)
-                    except UnknownBeamFileFormat:
-                        print(f"[!] Unable to load {arch_fp}")
-                        return
+                    print(f"[!] Unable to load {arch_fp}")
+                    return
 
     # Return BEAM files
     return beams
@@ -10,21 +10,38 @@ from beam.exceptions import UnknownBeamFileFormat
 
 def search_beams(search_path: str):
     beams = []
-    for root, dir, files in os.walk(search_path, topdown=True):
-        for filename in files:
-            filepath = os.path.join(root, filename)
-            if filepath.lower().endswith('.beam'):
-                try:
-                    print(' - loading beam %s ...' % filename)
-                    beams.append(load_beam(filepath))
-                except Exception as err:
-                    pass
-            elif filepath.lower().endswith('.ez'):
-                try:
-                    print(' - loading beam pack %s ...' % filename)
-                    beams.extend(load_beams_from_ez(filepath))
-                except Exception as err:
-                    pass
+
+    # Modules found share their atoms, for this search only
+    atom_pool = {}
+
+    # Walk directories depth-first, in the same order as os.walk() would,
+    # directory entries tell us their type without an extra stat() call
+    directories = [search_path]
+    while len(directories) > 0:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                entries = list(entries)
+        except OSError as err:
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif entry.is_file():
+                filename = entry.name.lower()
+                if filename.endswith('.beam'):
+                    try:
+                        print(' - loading beam %s ...' % entry.name)
+                        beams.append(load_beam(entry.path, atom_pool))
+                    except Exception as err:
+                        pass
+                elif filename.endswith('.ez'):
+                    try:
+                        print(' - loading beam pack %s ...' % entry.name)
+                        beams.extend(load_beams_from_ez(entry.path, atom_pool))
+                    except Exception as err:
+                        pass
+        directories.extend(reversed(subdirectories))
     return beams
 
 def load_beams(filepath: str):
@@ -42,18 +59,27 @@ def load_beams(filepath: str):
 def disassemble_beams(input_beams: list[BeamFile], output_dir: str):
     '''Load a single EZ file (compressed) or a single BEAM file
     '''
-    # Process multiple beam files contained in an EZ file
+    # Process multiple beam files contained in an EZ file. Sections are
+    # parsed on first use, a malformed module may only fail from here: it is
+    # reported and skipped.
     beams = []
     for beam in input_beams:
-        print(' - analyzing module %s ...' % beam.name)
-        beams.append(Beamalyzer(beam))
+        try:
+            print(' - analyzing module %s ...' % beam.name)
+            beams.append(Beamalyzer(beam))
+        except Exception as err:
+            print('[!] Cannot analyze module %s' % beam.name)
 
-    processed_beams = []
+    failed_beams = set()
     for beam in beams:
-        # Process each file independently, but consider all the files
-        # when solving cross-references.
-        print(' - annotating module %s ...' % beam.module.name)
-        beam.annotate(beams)
+        # Process each file independently, but consider all the files
+        # when solving cross-references.
+        try:
+            print(' - annotating module %s ...' % beam.module.name)
+            beam.annotate(beams)
+        except Exception as err:
+            print('[!] Cannot annotate module %s' % beam.module.name)
+            failed_beams.add(beam)
 
     # Make sure our output directory exists
     if not os.path.exists(output_dir):
@@ -61,14 +87,24 @@ def disassemble_beams(input_beams: list[BeamFile], output_dir: str):
 
     # Write the recovered BEAM modules into this output directory
     for beam in beams:
+        if beam in failed_beams:
+            continue
+
+        # Render the whole module first, a failure must not leave a partial
+        # file behind
+        try:
+            code = str(beam)
+        except Exception as err:
+            print('[!] Cannot disassemble module %s' % beam.module.name)
+            continue
+
         beamc_path = os.path.join(output_dir, '%s.beamc' % beam.module.name)
         print('[i] Writing disassembled code from module %s to %s' % (
             beam.module.name,
             beamc_path
         ))
         with open(beamc_path, 'w') as f:
-            f.write(str(beam))
-            f.close()
+            f.write(code)
 
 
 def prism_main():
@@ -1,12 +1,40 @@
+import sys
+
+from array import array
 from io import BytesIO
-from struct import unpack
+from struct import Struct
 from zlib import decompress
 
+from .exceptions import UnknownBeamFileFormat
 from .utils import BeamCompactTerm
 from .types import BeamInteger, BeamAtom
 from .ext import BeamExtTerm
 from .instset import BeamInstParser
 
+# Precompiled formats used by section parsers
+U16 = Struct('>H')
+U32 = Struct('>I')
+U32X5 = Struct('>IIIII')
+
+
+def read_u32_table(data, offset, count, end=None):
+    '''Read `count` BE Uint32 stored in `data` (bytes) at `offset` into an
+    array, at once.
+
+    Raises UnknownBeamFileFormat if the table goes beyond `end`.
+    '''
+    if end is None:
+        end = len(data)
+    raw = memoryview(data)[offset:min(offset + count*4, end)]
+    if len(raw) != count*4:
+        raise UnknownBeamFileFormat
+    table = array('I')
+    table.frombytes(raw)
+    if len(table) != count:
+        raise UnknownBeamFileFormat
+    if sys.byteorder == 'little':
+        table.byteswap()
+    return table
 
 class BeamLineSection(object):
 
@@ -15,6 +43,7 @@ class BeamLineSection(object):
         self.__flags = flags
         self.__lines = []
         self.__filenames = ['invalid location']
+        self.__line_strs = None
 
     @property
     def filenames(self):
@@ -32,7 +61,23 @@ class BeamLineSection(object):
             else:
                 return (self.__filenames[file_index], lineno)
         raise IndexError
-    
+
+    def get_str(self, line_index):
+        '''Get line reference as displayed in disassembly.
+
+        Line references are formatted all at once on first use, as many
+        line instructions share the same reference.
+        '''
+        if self.__line_strs is None:
+            self.__line_strs = [
+                '\t; line %d' % lineno if file_index == 0 else
+                '\t; file %s line %d' % (self.__filenames[file_index], lineno)
+                for file_index, lineno in self.__lines
+            ]
+        if line_index < len(self.__line_strs):
+            return self.__line_strs[line_index]
+        raise IndexError
+
     def enumerate(self):
         '''Enumerate line references
         '''
@@ -43,55 +88,67 @@ class BeamLineSection(object):
         '''Add a filename to our filename list
         '''
         self.__filenames.append(filename)
+        self.__line_strs = None
 
     def add_line_ref(self, file_index, line):
         '''Add a line reference in our line section
         '''
         self.__lines.append((file_index, line))
+        self.__line_strs = None
 
     @staticmethod
-    def parse(content):
-        '''Parse a line section
+    def parse(data, offset=0, end=None):
+        '''Parse a line section stored in `data` (bytes)
+        between `offset` and `end`
         '''
-        # First, parse line header (5 BE Uint32)
-        version, flags, line_instr_count, num_line_refs, num_filenames = unpack(
-            '>IIIII', content.read(5*4)
-        )
+        # First, parse line header (5 BE Uint32)
+        version, flags, line_instr_count, num_line_refs, num_filenames = \
+            U32X5.unpack_from(data, offset)
+        offset += 5*4
 
         section = BeamLineSection(version, flags)
 
         section.add_line_ref(0,0)
         fname_index = 0
 
-
+        read_term = BeamCompactTerm.read_term_from
+        add_line_ref = section.add_line_ref
         for i in range(num_line_refs):
-            term = BeamCompactTerm.read_term(content)
+            term, offset = read_term(data, offset)
             if isinstance(term, BeamInteger):
-                section.add_line_ref(fname_index, term.value)
+                add_line_ref(fname_index, term.value)
             elif isinstance(term, BeamAtom):
                 fname_index = term.index
                 assert fname_index < num_filenames
 
+        # Filenames are length-prefixed, walk them in a single pass
+        unpack_length = U16.unpack_from
+        add_filename = section.add_filename
         for i in range(num_filenames):
-            # Read filename length
-            filename_length = unpack('>H', content.read(2))[0]
-            filename = content.read(filename_length)
-            section.add_filename(filename)
+            # Read filename length
+            filename_length = unpack_length(data, offset)[0]
+            offset += 2
+            add_filename(bytes(data[offset:offset + filename_length]))
+            offset += filename_length
 
         return section
         
 class BeamAtomSection(object):
 
-    def __init__(self):
+    def __init__(self, pool=None):
         self.__atoms = [b'module']
 
+        # Atoms already seen, the same names (modules, functions) appear in
+        # many modules: a pool may be shared by the modules loaded together
+        self.__pool = {} if pool is None else pool
+
     def set_module_name(self, module_name):
         '''Set module name (atom #0)
         '''
         self.__atoms[0] = module_name
 
     def add(self, atom):
-        self.__atoms.append(atom)
+        self.__atoms.append(self.__pool.setdefault(atom, atom))
 
     def __len__(self):
         return len(self.__atoms)
@@ -107,16 +164,21 @@ class BeamAtomSection(object):
         return self.__atoms
 
     @staticmethod
-    def parse(content):
-        '''Parse an atom section.
+    def parse(data, offset=0, end=None, pool=None):
+        '''Parse an atom section stored in `data` (bytes)
+        between `offset` and `end`, sharing atoms through `pool` (dict)
+        if provided.
         '''
-        section = BeamAtomSection()
+        section = BeamAtomSection(pool)
 
-        atoms_count = unpack('>I', content.read(4))[0]
+        atoms_count = U32.unpack_from(data, offset)[0]
+        offset += 4
 
         for i in range(atoms_count):
-            atom_length = unpack('>B', content.read(1))[0]
-            atom = content.read(atom_length)
+            atom_length = data[offset]
+            offset += 1
+            atom = bytes(data[offset:offset + atom_length])
+            offset += atom_length
             section.add(atom)
 
         return section
@@ -124,28 +186,18 @@ class BeamAtomSection(object):
 class BeamImportEntry(object):
     '''BEAM export entry
     '''
+    __slots__ = ('module', 'function', 'arity')
+
     def __init__(self, module, function, arity):
-        self.__module = module
-        self.__function = function
-        self.__arity = arity
+        self.module = module
+        self.function = function
+        self.arity = arity
 
-    @property
-    def module(self):
-        return self.__module
-    
-    @property
-    def function(self):
-        return self.__function
-    
-    @property
-    def arity(self):
-        return self.__arity
-    
     def __repr__(self):
         return 'BeamImportEntry(module:%d, function:%d, arity:%d)' % (
-            self.__module,
-            self.__function,
-            self.__arity
+            self.module,
+            self.function,
+            self.arity
         )
 
 class BeamImportSection(object):
@@ -153,64 +205,67 @@ class BeamImportSection(object):
     '''
 
     def __init__(self):
-        self.__imports = []
+        # Import fields are stored in parallel arrays, entries are only
+        # created when requested
+        self.__modules = array('I')
+        self.__functions = array('I')
+        self.__arities = array('I')
 
     @property
     def imports(self):
-        return self.__imports
+        return [
+            BeamImportEntry(module_index, function_index, arity)
+            for module_index, function_index, arity in zip(
+                self.__modules, self.__functions, self.__arities
+            )
+        ]
 
     def add(self, module_index, function_index, arity):
-        self.__imports.append(BeamImportEntry(
-            module_index,
-            function_index,
-            arity
-        ))
+        self.__modules.append(module_index)
+        self.__functions.append(function_index)
+        self.__arities.append(arity)
 
     def get(self, index):
         '''Get specific import
         '''
-        if index < len(self.__imports):
-            return self.__imports[index]
+        if index < len(self.__modules):
+            return BeamImportEntry(
+                self.__modules[index],
+                self.__functions[index],
+                self.__arities[index]
+            )
         raise IndexError
 
     @staticmethod
-    def parse(content):
-        '''Parse BEAM import section
+    def parse(data, offset=0, end=None):
+        '''Parse BEAM import section stored in `data` (bytes)
+        between `offset` and `end`
         '''
         section = BeamImportSection()
-        imports_count = unpack('>I', content.read(4))[0]
-        for i in range(imports_count):
-            module_index, function_index, arity = unpack(
-                '>III', content.read(3*4)
-            )
-            section.add(module_index, function_index, arity)
+        imports_count = U32.unpack_from(data, offset)[0]
+
+        # Load all entries at once, then split their fields
+        table = read_u32_table(data, offset + 4, imports_count*3, end)
+        section.__modules = table[0::3]
+        section.__functions = table[1::3]
+        section.__arities = table[2::3]
         return section
 
 class BeamExportEntry(object):
     '''BEAM export
     '''
-    def __init__(self, name, arity, label):
-        self.__name = name
-        self.__arity = arity
-        self.__label = label
+    __slots__ = ('name', 'arity', 'label')
 
-    @property
-    def name(self):
-        return self.__name
-
-    @property
-    def arity(self):
-        return self.__arity
-
-    @property
-    def label(self):
-        return self.__label
+    def __init__(self, name, arity, label):
+        self.name = name
+        self.arity = arity
+        self.label = label
 
     def __repr__(self):
         return 'BeamExportEntry(name:%d, arity:%d, label:%d)' % (
-            self.__name,
-            self.__arity,
-            self.__label
+            self.name,
+            self.arity,
+            self.label
         )
 
 class BeamExportSection(object):
@@ -218,79 +273,75 @@ class BeamExportSection(object):
     '''
 
     def __init__(self):
-        self.__exports = []
+        # Export fields are stored in parallel arrays, entries are only
+        # created when requested
+        self.__names = array('I')
+        self.__arities = array('I')
+        self.__labels = array('I')
 
     @property
     def exports(self):
-        return self.__exports
+        return [
+            BeamExportEntry(name, arity, label)
+            for name, arity, label in zip(
+                self.__names, self.__arities, self.__labels
+            )
+        ]
 
     def add(self, name, arity, label):
-        self.__exports.append(BeamExportEntry(name, arity, label))
+        self.__names.append(name)
+        self.__arities.append(arity)
+        self.__labels.append(label)
 
     def get(self, index):
         '''Get specific export
         '''
-        if index < len(self.__exports):
-            return self.__exports[index]
+        if index < len(self.__names):
+            return BeamExportEntry(
+                self.__names[index],
+                self.__arities[index],
+                self.__labels[index]
+            )
         raise IndexError
 
     @staticmethod
-    def parse(content):
-        '''Parse BEAM export section
+    def parse(data, offset=0, end=None):
+        '''Parse BEAM export section stored in `data` (bytes)
+        between `offset` and `end`
         '''
         section = BeamExportSection()
 
-        exports_count = unpack('>I', content.read(4))[0]
-        for i in range(exports_count):
-            export_name, arity, lbl_offset = unpack('>III', content.read(3*4))
-            section.add(export_name, arity, lbl_offset)
+        exports_count = U32.unpack_from(data, offset)[0]
+
+        # Load all entries at once, then split their fields
+        table = read_u32_table(data, offset + 4, exports_count*3, end)
+        section.__names = table[0::3]
+        section.__arities = table[1::3]
+        section.__labels = table[2::3]
 
         return section
 
 class BeamFunctionEntry(object):
     '''BEAM function entry
     '''
+    __slots__ = ('name', 'arity', 'offset', 'index', 'nfree', 'ouniq')
 
     def __init__(self, func_atom, arity, offset, index, nfree, ouniq):
-        self.__func_atom = func_atom
-        self.__arity = arity
-        self.__offset = offset
-        self.__index = index
-        self.__nfree = nfree
-        self.__ouniq = ouniq
-
-    @property
-    def name(self):
-        return self.__func_atom
-
-    @property
-    def arity(self):
-        return self.__arity
-
-    @property
-    def offset(self):
-        return self.__offset
-
-    @property
-    def index(self):
-        return self.__index
-
-    @property
-    def nfree(self):
-        return self.__nfree
-
-    @property
-    def ouniq(self):
-        return self.__ouniq
+        self.name = func_atom
+        self.arity = arity
+        self.offset = offset
+        self.index = index
+        self.nfree = nfree
+        self.ouniq = ouniq
 
     def __repr__(self):
         return 'BeamFunctionEntry(atom:%d, arity:%d, offset:%d, index:%d, nfree:%d, ouniq:%d)' % (
-            self.__func_atom,
-            self.__arity,
-            self.__offset,
-            self.__index,
-            self.__nfree,
-            self.__ouniq
+            self.name,
+            self.arity,
+            self.offset,
+            self.index,
+            self.nfree,
+            self.ouniq
         )
 
 class BeamFunctionSection(object):
@@ -298,31 +349,49 @@ class BeamFunctionSection(object):
     '''
 
     def __init__(self):
-        self.__functions = []
+        # Function fields are stored in parallel arrays, entries are only
+        # created when requested
+        self.__names = array('I')
+        self.__arities = array('I')
+        self.__offsets = array('I')
+        self.__indexes = array('I')
+        self.__nfrees = array('I')
+        self.__ouniqs = array('I')
 
     def add(self, func, arity, offset, index, nfree, ouniq):
-        self.__functions.append(BeamFunctionEntry(
-            func, arity, offset, index, nfree, ouniq
-        ))
+        self.__names.append(func)
+        self.__arities.append(arity)
+        self.__offsets.append(offset)
+        self.__indexes.append(index)
+        self.__nfrees.append(nfree)
+        self.__ouniqs.append(ouniq)
 
     @property
     def functions(self):
-        return self.__functions
+        return [
+            BeamFunctionEntry(*fields) for fields in zip(
+                self.__names, self.__arities, self.__offsets, self.__indexes,
+                self.__nfrees, self.__ouniqs
+            )
+        ]
 
     @staticmethod
-    def parse(content):
-        '''Parse function section
+    def parse(data, offset=0, end=None):
+        '''Parse function section stored in `data` (bytes)
+        between `offset` and `end`
         '''
         section = BeamFunctionSection()
 
-        funcs_count = unpack('>I', content.read(4))[0]
+        funcs_count = U32.unpack_from(data, offset)[0]
 
-        for i in range(funcs_count):
-            fun_atom_index, arity, offset, index, nfree, ouniq = unpack(
-                '>IIIIII',
-                content.read(6*4)
-            )
-            section.add(fun_atom_index, arity, offset, index, nfree, ouniq)
+        # Load all entries at once, then split their fields
+        table = read_u32_table(data, offset + 4, funcs_count*6, end)
+        section.__names = table[0::6]
+        section.__arities = table[1::6]
+        section.__offsets = table[2::6]
+        section.__indexes = table[3::6]
+        section.__nfrees = table[4::6]
+        section.__ouniqs = table[5::6]
 
         return section
 
@@ -342,29 +411,39 @@ class BeamLiteralSection(object):
         return None
 
     @staticmethod
-    def parse(content):
-        '''Parse BEAM literal section
+    def parse(data, offset=0, end=None):
+        '''Parse BEAM literal section stored in `data` (bytes)
+        between `offset` and `end`
         '''
 
         section = BeamLiteralSection()
 
         # Read uncompressed size
-        uncompressed_size = unpack('>I', content.read(4))[0]
-
-        # Read compressed data and decompress
-        compressed_data = content.getvalue()[4:]
-        data = BytesIO(decompress(compressed_data))
+        uncompressed_size = U32.unpack_from(data, offset)[0]
+
+        # Decompress data straight from the chunk (slicing a memoryview does
+        # not copy it), the output buffer is allocated at its final size.
+        # This size comes from the file, never trust it beyond what deflate
+        # can actually produce (at most 1032 bytes per compressed byte).
+        compressed = memoryview(data)[offset + 4:end]
+        data = decompress(
+            compressed,
+            bufsize=min(uncompressed_size, len(compressed) * 1032)
+        )
 
-        # Parse decompressed data
-        value_count = unpack('>I', data.read(4))[0]
+        # Parse decompressed data
+        value_count = U32.unpack_from(data)[0]
+        offset = 4
+        parse_term = BeamExtTerm.parse
+        add = section.add
         for i in range(value_count):
             # Skip Uint32
-            _ = data.read(4)
+            offset += 4
 
-            # Read byte ext
-            ext_term = BeamExtTerm.parse(data)
+            # Read byte ext
+            ext_term, offset = parse_term(data, offset)
 
-            section.add(ext_term)
+            add(ext_term)
 
         return section
 
@@ -383,25 +462,29 @@ class BeamCodeSection(object):
         self.__insts.append(inst)
 
     @staticmethod
-    def parse(content):
-        '''Parse code section content
+    def parse(data, offset=0, end=None):
+        '''Parse code section stored in `data` (bytes)
+        between `offset` and `end`
         '''
         # Code section
         section = BeamCodeSection()
 
-        # Parse code version
-        code_version = unpack('>I', content.read(4))[0]
-  
-        # Read different objects counts
-        instset, highest_opcode, label_count, fun_count = unpack('>IIII', content.read(4*4))
-
-        bytes_read = 20
-        content_length = len(content.getvalue())
-
-        # Read instructions
-        insts = []
-        while content.tell() < content_length:
-            inst = BeamInstParser.parse(content)
-            section.add(inst)
+        # Instructions are decoded from a stream over the whole data (a
+        # BytesIO shares the content of a bytes object instead of copying it)
+        if end is None:
+            end = len(data)
+        content = BytesIO(data)
+        content.seek(offset)
+
+        # Parse code version and read different objects counts
+        code_version, instset, highest_opcode, label_count, fun_count = \
+            U32X5.unpack(content.read(5*4))
+
+        # Read instructions
+        parse_inst = BeamInstParser.parse
+        tell = content.tell
+        add = section.add
+        while tell() < end:
+            add(parse_inst(content))
 
         return section
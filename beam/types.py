@@ -1,62 +1,50 @@
 '''BEAM types
 '''
-from struct import unpack
 from .exceptions import UnsupportedBeamCompactTerm
 
 def bytes_to_int(b):
-    value = 0
-    for i in range(len(b)):
-        value = (value<<8)
-        value |= b[i]
-    return value
+    return int.from_bytes(b, 'big')
 
 class BeamNIL(object):
-    pass
+    __slots__ = ()
 
 class BeamInteger(object):
     '''Represents a BEAM integer value.
     '''
+    __slots__ = ('value',)
+
     def __init__(self, value):
-        super().__init__()
         if isinstance(value, int):
-            self.__value = value
+            self.value = value
         elif isinstance(value, bytes):
-            v = 0
-            for i in range(len(value)-1, -1, -1):
-                v += (256**i)*(value[len(value)-1-i])
-            self.__value = v
+            self.value = int.from_bytes(value, 'big')
         else:
             raise UnsupportedBeamCompactTerm
 
-    @property
-    def value(self):
-        return self.__value
-
     def __repr__(self):
         return 'BeamInteger(%d)' % self.value
     
 class BeamLiteral(object):
     '''Represents a BEAM literal
     '''
+    __slots__ = ('index',)
+
     def __init__(self, index):
-        super().__init__()
         if isinstance(index, int):
-            self.__index = index
+            self.index = index
         elif isinstance(index, bytes):
-            self.__index = bytes_to_int(index)
+            self.index = int.from_bytes(index, 'big')
         else:
             raise UnsupportedBeamCompactTerm
 
-    @property
-    def index(self):
-        return self.__index
-
     def __repr__(self):
         return 'BeamLiteral(%d)' % self.index
 
 class BeamLabel(BeamLiteral):
     '''Represents a BEAM label
     '''
+    __slots__ = ()
+
     def __init__(self, index):
         super().__init__(index)
 
@@ -66,12 +54,14 @@ class BeamLabel(BeamLiteral):
 class BeamAtom(object):
     '''Represents a BEAM Atom
     '''
+    __slots__ = ('__index',)
+
     def __init__(self, index):
         super().__init__()
         if isinstance(index, int):
             self.__index = index
         elif isinstance(index, bytes):
-            self.__index = bytes_to_int(index)
+            self.__index = int.from_bytes(index, 'big')
         else:
             raise UnsupportedBeamCompactTerm
 
@@ -94,13 +84,10 @@ class BeamAtom(object):
 class BeamXReg(object):
     '''Represents an X register
     '''
-    def __init__(self, index):
-        super().__init__()
-        self.__index = index
+    __slots__ = ('index',)
 
-    @property
-    def index(self):
-        return self.__index
+    def __init__(self, index):
+        self.index = index
 
     def __repr__(self):
         return 'X%d' % self.index
@@ -108,6 +95,8 @@ class BeamXReg(object):
 class BeamYReg(BeamXReg):
     '''Represents an Y register
     '''
+    __slots__ = ()
+
     def __init__(self, index):
         super().__init__(index)
 
@@ -117,6 +106,8 @@ class BeamYReg(BeamXReg):
 class BeamChar(object):
     '''Represents a character (unicode)
     '''
+    __slots__ = ('__char_value',)
+
     def __init__(self, value):
         super().__init__()
         self.__char_value = value
@@ -131,6 +122,8 @@ class BeamChar(object):
 class BeamExtList(object):
     '''Represents a BEAM extended list
     '''
+    __slots__ = ('__items',)
+
     def __init__(self):
         super().__init__()
         self.__items = []
@@ -143,24 +136,22 @@ class BeamExtList(object):
             return self.__items[index]
         raise IndexError
 
+    def __iter__(self):
+        return iter(self.__items)
+
     def add(self, item):
         self.__items.append(item)
 
     def __repr__(self):
-        #pairs = ','.join(['(%s, %s)' % (str(k), str(v)) for k,v in self.__pairs])
-        items = ','.join(['%s' % str(v) for v in self.__items])
-        return 'BeamList(%s)' % items
+        return 'BeamList(%s)' % ','.join(map(str, self.__items))
 
 class BeamFpReg(object):
     '''Represents an FR register
     '''
-    def __init__(self, index):
-        super().__init__()
-        self.__index = index
+    __slots__ = ('index',)
 
-    @property
-    def index(self):
-        return self.__index
+    def __init__(self, index):
+        self.index = index
 
     def __repr__(self):
         return 'FR%d' % self.index
@@ -169,17 +160,11 @@ class BeamTypedReg(object):
     '''Typed register
     '''
 
-    def __init__(self, register, regtype):
-        self.__reg = register
-        self.__reg_type = regtype
-
-    @property
-    def register(self):
-        return self.__reg
+    __slots__ = ('register', 'typeinfo')
 
-    @property
-    def typeinfo(self):
-        return self.__reg_type
+    def __init__(self, register, regtype):
+        self.register = register
+        self.typeinfo = regtype
 
     def __str__(self):
-        return '{}<{}>'.format(self.__reg, self.__reg_type.index)
+        return '{}<{}>'.format(self.register, self.typeinfo.index)
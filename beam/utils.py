@@ -5,6 +5,13 @@ from .exceptions import UnsupportedBeamCompactTerm
 from .types import BeamAtom, BeamInteger, BeamChar, BeamLabel, BeamLiteral, \
     BeamNIL, BeamXReg, BeamYReg, BeamExtList, BeamFpReg, BeamTypedReg
 
+# Ways a compact term value is encoded, depending on its first byte
+TAG_INLINE = 0  # value in the 4 upper bits
+TAG_SHORT = 1   # 3 upper bits of an 11-bit value, followed by one byte
+TAG_BYTES = 2   # 2 to 8 bytes value
+TAG_LONG = 3    # value length (minus 9) given by a following term
+TAG_EXT = 4     # extended type
+
 class BeamCompactTerm(object):
 
     TYPE_LIT = 0
@@ -22,21 +29,22 @@ class BeamCompactTerm(object):
     TYPE_EXT_LIT = 0x47
     TYPE_EXT_TYPED_REG = 0x57
 
-    DECODERS = {
-        TYPE_LIT: BeamLiteral,
-        TYPE_INT: BeamInteger,
-        TYPE_ATOM: BeamAtom,
-        TYPE_XREG: BeamXReg,
-        TYPE_YREG: BeamYReg,
-        TYPE_LBL: BeamLabel,
-        TYPE_CHAR: BeamChar,
-    }
+    # Basic type decoders, indexed by type (TYPE_LIT to TYPE_CHAR)
+    DECODERS = (
+        BeamLiteral,
+        BeamInteger,
+        BeamAtom,
+        BeamXReg,
+        BeamYReg,
+        BeamLabel,
+        BeamChar,
+    )
 
     @staticmethod
     def decode_value(source, value, value_type):
         '''Decode value based on type
         '''
-        if value_type in BeamCompactTerm.DECODERS:
+        if 0 <= value_type < len(BeamCompactTerm.DECODERS):
             return BeamCompactTerm.DECODERS[value_type](value)
         else:
             raise UnsupportedBeamCompactTerm
@@ -63,8 +71,7 @@ class BeamCompactTerm(object):
         elif value_type == BeamCompactTerm.TYPE_EXT_LIST:
             # Read smallint
             list_obj = BeamExtList()
-            literal = BeamCompactTerm.read_term(source)
-            for i in range(int(literal.index)):
+            for i in range(BeamCompactTerm.read_int(source)):
                 #key = BeamCompactTerm.read_term(source)
                 value = BeamCompactTerm.read_term(source)
                 list_obj.add(value)
@@ -72,8 +79,7 @@ class BeamCompactTerm(object):
         elif value_type == BeamCompactTerm.TYPE_EXT_ALST:
             # Read smallint
             list_obj = BeamExtList()
-            literal = BeamCompactTerm.read_term(source)
-            for i in range(int(literal.index/2)):
+            for i in range(BeamCompactTerm.read_int(source) // 2):
                 #key = BeamCompactTerm.read_term(source)
                 value = BeamCompactTerm.read_term(source)
                 list_obj.add(value)
@@ -86,33 +92,90 @@ class BeamCompactTerm(object):
             else:
                 raise UnsupportedBeamCompactTerm
         raise UnsupportedBeamCompactTerm
- 
+
+    @staticmethod
+    def read_int(source):
+        '''Read a basic compact term and return its value as an integer,
+        without building a term object (used for lengths and counts).
+        '''
+        encoding, decoder, arg = TAGS_TABLE[source.read(1)[0]]
+        if encoding == TAG_INLINE:
+            return arg
+        elif encoding == TAG_SHORT:
+            return arg | source.read(1)[0]
+        elif encoding == TAG_BYTES:
+            return int.from_bytes(source.read(arg), 'big')
+        elif encoding == TAG_LONG:
+            value_len = BeamCompactTerm.read_int(source) + 9
+            return int.from_bytes(source.read(value_len), 'big')
+        raise UnsupportedBeamCompactTerm
+
     @staticmethod
     def read_term(source):
         '''Read a tag.
         '''
-        # Read 1 byte
-        b0 = ord(source.read(1))
-        # Deduce type
-        if b0 & 0x07 == 0x07:
-            # Extended type, type is coded in a whole byte
-            value_type = b0
-
-            return BeamCompactTerm.decode_ext(source, value_type)
+        # Read 1 byte (indexing bytes is cheaper than calling ord()), its
+        # encoding and type are looked up rather than tested bit by bit
+        b0 = source.read(1)[0]
+        encoding, decoder, arg = TAGS_TABLE[b0]
+        if encoding == TAG_INLINE:
+            return decoder(arg)
+        elif encoding == TAG_SHORT:
+            return decoder(arg | source.read(1)[0])
+        elif encoding == TAG_BYTES:
+            return decoder(source.read(arg))
+        elif encoding == TAG_LONG:
+            value_len = BeamCompactTerm.read_int(source) + 9
+            return decoder(source.read(value_len))
         else:
-            # Basic type, let's decode it
-            value_type = b0 & 0x07
-            if (b0 & (1 << 3)):
-                if (b0 & (1 << 4)):
-                    if (b0 >> 5) == 7:
-                        value_len = BeamCompactTerm.read_term(source).index + 9
-                        value = source.read(value_len)
-                    else:
-                        value_len = (b0 >> 5) + 2
-                        value = source.read(value_len)
-                else:
-                    value = ((b0 & 0xE0)<<3) | ord(source.read(1))
-            else:
-                value = b0 >> 4
+            # Extended type, type is coded in a whole byte
+            return BeamCompactTerm.decode_ext(source, b0)
+
+    @staticmethod
+    def read_term_from(data, offset):
+        '''Read a tag stored in `data` (bytes) at `offset`.
+
+        Return a tuple (term, offset of the next byte following this term).
+        Only basic types are supported, extended ones are only found in code
+        and read with `read_term()`.
+        '''
+        # Read 1 byte
+        encoding, decoder, arg = TAGS_TABLE[data[offset]]
+        offset += 1
+        if encoding == TAG_INLINE:
+            value = arg
+        elif encoding == TAG_SHORT:
+            value = arg | data[offset]
+            offset += 1
+        elif encoding == TAG_BYTES or encoding == TAG_LONG:
+            if encoding == TAG_LONG:
+                length, offset = BeamCompactTerm.read_term_from(data, offset)
+                arg = length.index + 9
+            value = bytes(data[offset:offset + arg])
+            offset += arg
+        else:
+            raise UnsupportedBeamCompactTerm
+
+        return decoder(value), offset
+
+
+def tag_encoding(b0):
+    '''Compute how a compact term starting with byte `b0` is encoded.
+
+    Return a tuple (encoding, decoder, argument), the argument being the
+    inline value, the upper bits of a short value or a value length.
+    '''
+    if b0 & 0x07 == 0x07:
+        return (TAG_EXT, None, None)
+    decoder = BeamCompactTerm.DECODERS[b0 & 0x07]
+    if not (b0 & (1 << 3)):
+        return (TAG_INLINE, decoder, b0 >> 4)
+    elif not (b0 & (1 << 4)):
+        return (TAG_SHORT, decoder, (b0 & 0xE0)<<3)
+    elif (b0 >> 5) == 7:
+        return (TAG_LONG, decoder, None)
+    else:
+        return (TAG_BYTES, decoder, (b0 >> 5) + 2)
 
-            return BeamCompactTerm.decode_value(source, value, value_type)
+# Compact term encodings, indexed by first byte
+TAGS_TABLE = tuple(tag_encoding(b0) for b0 in range(256))